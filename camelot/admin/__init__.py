@@ -50,6 +50,42 @@ class AbstractAdmin(AdminRoute):
     def get_static_field_attributes(self, field_names):
         raise NotImplementedError
 
+    def copy(self, obj):
+        raise NotImplementedError
+
+    def copy_many(self, objects):
+        """Copy a list of objects.  By default, the objects are copied one
+        by one.
+
+        :return: a list with the copies, in the same order as the objects
+        """
+        return [self.copy(obj) for obj in objects]
+
+    def set_field_value(self, obj, field_name, value):
+        raise NotImplementedError
+
+    def set_field_value_many(self, objects, field_name, value):
+        """Set a field of a list of objects to the same value.  By default,
+        the field is set on the objects one by one.  Admins for which setting
+        the field has no side effects beyond changing the column, can
+        overwrite this method to update the objects at once, for example
+        using :func:`camelot.core.orm.bulk_update`.
+        """
+        for obj in objects:
+            self.set_field_value(obj, field_name, value)
+
+    def delete(self, obj):
+        raise NotImplementedError
+
+    def delete_many(self, objects):
+        """Delete a list of objects.  By default, the objects are deleted
+        one by one.  Admins for which deleting objects has no side effects
+        beyond removing the rows, can overwrite this method to delete the
+        objects at once, for example using :func:`camelot.core.orm.bulk_delete`.
+        """
+        for obj in objects:
+            self.delete(obj)
+
     def get_list_action(self) -> Route:
         raise NotImplementedError
 
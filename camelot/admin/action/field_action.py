@@ -64,6 +64,17 @@ class FieldActionModelContext(ApplicationActionModelContext):
         A dictionary of field attributes of the field to which the context
         relates.
 
+    .. attribute:: static_field_attributes
+
+        A dictionary with the static field attributes of the column to which
+        the context relates, when the context is used to fill a table.  These
+        attributes are known to be constant for the whole column.
+
+    .. attribute:: prefetched_data
+
+        A dictionary with the data prefetched by the delegate of the column,
+        shared by the items that are created in the same request.
+
     """
 
     def __init__(self, admin):
@@ -72,6 +83,8 @@ class FieldActionModelContext(ApplicationActionModelContext):
         self.field = None
         self.value = None
         self.field_attributes = {}
+        self.static_field_attributes = {}
+        self.prefetched_data = {}
 
 
 class EditFieldAction(Action):
@@ -228,15 +241,23 @@ class AddExistingObject(EditFieldAction):
         field_admin = model_context.field_attributes.get('admin')
         if field_admin is not None:
             objs_to_add = yield action_steps.SelectObjects(field_admin.get_query(), field_admin)
-            # filter out objects already in model_context.value
-            objs_to_add = [obj for obj in objs_to_add if obj not in model_context.value]
+            # filter out objects already in model_context.value, and objects
+            # selected twice, using their identity
+            collection = model_context.value
+            in_collection = set(id(obj) for obj in collection)
+            new_objs = []
+            for obj in objs_to_add:
+                if id(obj) not in in_collection:
+                    in_collection.add(id(obj))
+                    new_objs.append(obj)
+            objs_to_add = new_objs
             if not objs_to_add:
                 return
-            for obj_to_add in objs_to_add:
-                model_context.value.append(obj_to_add)
-            yield action_steps.UpdateObjects(objs_to_add)
-            for obj_to_add in objs_to_add:
-                yield action_steps.FlushSession(orm.object_session(obj_to_add))
-                break
+            collection.extend(objs_to_add)
+            session = orm.object_session(objs_to_add[0])
+            if session is not None:
+                yield action_steps.FlushSession(session, objects_updated=objs_to_add)
+            else:
+                yield action_steps.UpdateObjects(objs_to_add)
 
 add_existing_object = AddExistingObject()
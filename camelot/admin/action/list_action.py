@@ -29,6 +29,7 @@
 
 import enum
 import logging
+import time
 
 from ...core.qt import QtGui, QtWidgets
 from .base import Action, Mode, RenderHint
@@ -184,23 +185,60 @@ class DuplicateSelection( EditAction ):
     name = 'duplicate_selection'
 
     crud_type = 'CREATE'
+    # number of objects copied and flushed at once
+    chunk_size = 100
 
     def model_run( self, model_context, mode ):
         from camelot.view import action_steps
         super().model_run(model_context, mode)
         admin = model_context.admin
-        if model_context.selection_count > 1:
-            raise UserException(self.Message.no_single_selection.value)
-        for obj in model_context.get_selection():
-            new_object = admin.copy(obj)
-            model_context.proxy.append(new_object)
-            yield action_steps.CreateObjects([new_object])
-            if not len(admin.get_validator().validate_object(new_object)):
-                updated_objects = set(admin.get_depending_objects(new_object))
+        validator = admin.get_validator()
+        objects = list(model_context.get_selection())
+        number_of_objects = len(objects)
+        if number_of_objects > 1:
+            yield action_steps.UpdateProgress(0, number_of_objects, _('Duplicating'))
+        skipped_objects = 0
+        for i in range(0, number_of_objects, self.chunk_size):
+            new_objects = admin.copy_many(objects[i:i+self.chunk_size])
+            model_context.proxy.extend(new_objects)
+            invalid_objects = [
+                new_object for new_object in new_objects if len(validator.validate_object(new_object))
+            ]
+            updated_objects = set()
+            for new_object in new_objects:
+                updated_objects.update(admin.get_depending_objects(new_object))
+            updated_objects.difference_update(new_objects)
+            if len(invalid_objects) and (number_of_objects == 1):
+                # the copy is not flushed, so the user can complete it
+                yield action_steps.CreateObjects(new_objects)
                 yield action_steps.UpdateObjects(updated_objects)
-                yield action_steps.FlushSession(model_context.session)
-            else:
-                yield action_steps.OpenFormView(new_object, admin)
+                yield action_steps.OpenFormView(invalid_objects[0], admin)
+                return
+            if len(invalid_objects):
+                # invalid copies of a selection cannot be completed one by
+                # one, so they are discarded
+                model_context.proxy.remove_many(invalid_objects)
+                for invalid_object in invalid_objects:
+                    admin.expunge(invalid_object)
+                skipped_objects += len(invalid_objects)
+                invalid_ids = set(id(obj) for obj in invalid_objects)
+                new_objects = [obj for obj in new_objects if id(obj) not in invalid_ids]
+            yield action_steps.FlushSession(
+                model_context.session, objects_updated=updated_objects, objects_created=new_objects
+            )
+            if number_of_objects > 1:
+                yield action_steps.UpdateProgress(
+                    min(i + self.chunk_size, number_of_objects), number_of_objects, _('Duplicating')
+                )
+        if skipped_objects:
+            yield action_steps.MessageBox(
+                title = _('Duplicate'),
+                icon = Icon('exclamation-triangle'),
+                text = ugettext('%s of %s rows were not duplicated, because their copies are not valid')%(
+                    skipped_objects, number_of_objects
+                ),
+                standard_buttons = [QtWidgets.QMessageBox.StandardButton.Ok],
+            )
 
     def get_state(self, model_context):
         state = super().get_state(model_context)
@@ -221,6 +259,10 @@ class DeleteSelection( EditAction ):
     verbose_name = _('Delete')
 
     crud_type = 'DELETE'
+    # number of objects handed to the admin at once for deletion
+    chunk_size = 500
+    # minimum number of seconds between progress updates
+    progress_interval = 0.1
 
     def model_run( self, model_context, mode ):
         from camelot.view import action_steps
@@ -253,26 +295,26 @@ class DeleteSelection( EditAction ):
         depending_objects = set()
         for o in objects_to_remove:
             depending_objects.update( set( admin.get_depending_objects( o ) ) )
-        for i, obj in enumerate( objects_to_remove ):
-            yield action_steps.UpdateProgress( i + 1,
-                                               (1 if self.remove_only() else 2) * model_context.selection_count,
-                                               _('Removing') )
-            #
-            # We should not update depending objects that have
-            # been deleted themselves
-            #
-            try:
-                depending_objects.remove( obj )
-            except KeyError:
-                pass
-            model_context.proxy.remove(obj)
+        #
+        # We should not update depending objects that have
+        # been deleted themselves
+        #
+        depending_objects.difference_update( objects_to_remove )
+        number_of_objects = len( objects_to_remove )
+        maximum = (1 if self.remove_only() else 2) * number_of_objects
+        yield action_steps.UpdateProgress( 0, maximum, _('Removing') )
+        model_context.proxy.remove_many(objects_to_remove)
         if not self.remove_only():
+            yield action_steps.UpdateProgress( number_of_objects, maximum, _('Removing') )
             yield action_steps.DeleteObjects(objects_to_remove)
-            for i, obj in enumerate( objects_to_remove ):
-                yield action_steps.UpdateProgress( model_context.selection_count + i + 1,
-                                                   2 * model_context.selection_count,
-                                                   _('Removing') )
-                model_context.admin.delete(obj)
+            progress_time = time.monotonic()
+            for i in range( 0, number_of_objects, self.chunk_size ):
+                model_context.admin.delete_many( objects_to_remove[i:i+self.chunk_size] )
+                if time.monotonic() - progress_time >= self.progress_interval:
+                    progress_time = time.monotonic()
+                    yield action_steps.UpdateProgress( number_of_objects + min( i + self.chunk_size, number_of_objects ),
+                                                       maximum,
+                                                       _('Removing') )
         else:
             yield action_steps.RefreshItemView(model_context)
         yield action_steps.UpdateObjects(depending_objects)
@@ -398,17 +440,22 @@ class ReplaceFieldContents( EditAction ):
             change_object.title = _('Replace field contents')
             yield change_object
             yield action_steps.UpdateProgress(text=_('Replacing field'))
+            objects = list(model_context.get_selection())
+            # the admin might make the field read only for some objects
             dynamic_field_attributes = admin.get_dynamic_field_attributes
+            for obj in objects:
+                dynamic_fa = list(dynamic_field_attributes(obj, [selected_field]))[0]
+                if dynamic_fa.get('editable', True) == False:
+                    raise UserException(self.message, resolution=self.resolution)
             with model_context.session.begin():
-                for obj in model_context.get_selection():
-                    dynamic_fa = list(dynamic_field_attributes(obj, [selected_field]))[0]
-                    if dynamic_fa.get('editable', True) == False:
-                        raise UserException(self.message, resolution=self.resolution)
-                    admin.set_field_value(obj, selected_field, field_value.value)
-                    # dont rely on the session to update the gui, since the objects
-                    # might not be in a session
-                yield action_steps.UpdateObjects(model_context.get_selection())
-            yield action_steps.FlushSession(model_context.session)
+                admin.set_field_value_many(objects, selected_field, field_value.value)
+            yield action_steps.FlushSession(
+                model_context.session,
+                # the updated objects are passed explicitly, since they might
+                # not be in the session, or not be changed when they were
+                # updated with a statement
+                objects_updated=objects,
+            )
 
 replace_field_contents = ReplaceFieldContents()
 
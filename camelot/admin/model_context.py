@@ -1,4 +1,5 @@
 from ..core.cache import ValueCache
+from ..core.item_model.proxy import merge_ranges
 from .action.application_action import ApplicationActionModelContext
 
 
@@ -80,9 +81,7 @@ class ObjectsModelContext(ApplicationActionModelContext):
         # during deletion or duplication, the collection might
         # change, while the selection remains the same, so we should
         # be careful when using the collection to generate selection data
-        for (first_row, last_row) in self.selected_rows:
-            for obj in self.proxy[first_row:last_row + 1]:
-                yield obj
+        yield from self.proxy.get_ranges(merge_ranges(self.selected_rows), yield_per)
 
     def get_collection( self, yield_per = None ):
         """
@@ -90,8 +89,7 @@ class ObjectsModelContext(ApplicationActionModelContext):
             should fetched from the database at the same time.
         :return: a generator over the objects in the list
         """
-        for obj in self.proxy[0:self.collection_count]:
-            yield obj
+        yield from self.proxy.get_ranges(merge_ranges([(0, self.collection_count - 1)]), yield_per)
             
     def get_object( self, row = None ):
         """
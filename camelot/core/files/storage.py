@@ -1,10 +1,18 @@
+import collections
+import gzip
+import hashlib
 import logging
 import os
 import shutil
+import sqlite3
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import closing
 from hashlib import sha1
 from pathlib import Path, PurePath
-from typing import Dict, BinaryIO, Tuple, IO, Generator, Optional
+from typing import Callable, Dict, BinaryIO, Tuple, IO, Generator, Iterable, Optional
 
 from camelot.core.conf import settings
 from camelot.core.exception import UserException
@@ -15,12 +23,20 @@ logger = logging.getLogger('camelot.core.files.storage')
 
 
 class StoredFile:
-    def __init__(self, storage: 'Storage', name: PurePath, verbose_name: str):
+    def __init__(self, storage: 'Storage', name: PurePath, verbose_name: str,
+                 content_hash: Optional[str] = None, size: Optional[int] = None):
+        """
+        :param content_hash: the hex digest of the content of the file, if it
+            was computed when the file was checked in
+        :param size: the number of bytes in the file, if it is known
+        """
         assert isinstance(name, PurePath)
         self.storage = storage
         self.name: PurePath = name
         assert isinstance(verbose_name, str)
         self.verbose_name = verbose_name
+        self.content_hash = content_hash
+        self.size = size
 
     def __getstate__(self) -> Dict[str, str]:
         """Returns the key of the file. To support pickling stored files
@@ -63,15 +79,27 @@ class Storage:
     script as well.
     """
 
-    def __init__(self, upload_to: PurePath):
+    # the size of the buffer used to copy files into the storage
+    buffer_size = 1024 * 1024
+    # the hashlib algorithm used to compute the content hash of checked in
+    # files, use None to disable hashing
+    hash_algorithm = 'sha256'
+
+    manifest_name = '.manifest.sqlite'
+
+    def __init__(self, upload_to: PurePath, indexed: bool = False):
         """
         :param upload_to: the subdirectory in which to put files
+        :param indexed: keep a manifest of the files in the storage, to list
+            them without scanning the directory.  Use :meth:`rebuild_index`
+            to create the manifest of an existing directory.
 
         The actual files will be put in settings.CAMELOT_MEDIA_ROOT + upload to.
         """
 
         assert isinstance(upload_to, PurePath)
         self._upload_to = upload_to
+        self.indexed = indexed
         #
         # don't do anything here that might reduce the startup time, like verifying the
         # availability of the storage, since the path might be on a slow network share
@@ -112,9 +140,81 @@ class Storage:
         :return: An iterator of StoredFile objects
         """
 
+        if self.indexed:
+            return self._list_indexed_files(prefix, suffix)
         pattern = f'{prefix}*{suffix}'
         upload_to_path = Path(self.upload_to)
-        return (StoredFile(self, PurePath(path.name), self._verbose_name(path)) for path in upload_to_path.glob(pattern))
+        return (
+            StoredFile(self, PurePath(path.name), self._verbose_name(path)) for path in upload_to_path.glob(pattern)
+            if not path.name.startswith(self.manifest_name)
+        )
+
+    def _connect_index(self, index_name: str, *statements: str) -> sqlite3.Connection:
+        """
+        :param index_name: the name of the index file in the storage directory
+        :param statements: statements to create the tables of the index
+        :return: a new connection to the index, which should be closed
+            after use, since the storage might be used from multiple threads.
+        """
+        connection = sqlite3.connect(str(Path(self.upload_to, index_name)), timeout=60, isolation_level=None)
+        for statement in statements:
+            connection.execute(statement)
+        return connection
+
+    def _connect_manifest(self) -> sqlite3.Connection:
+        return self._connect_index(
+            self.manifest_name,
+            'CREATE TABLE IF NOT EXISTS file (name TEXT PRIMARY KEY, basename TEXT NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS file_basename ON file (basename)',
+        )
+
+    def _list_indexed_files(self, prefix: str, suffix: str) -> Generator[StoredFile, None, None]:
+        """List the files from the manifest, using a range scan on the
+        prefix of their basename.
+        """
+        self.available()
+        with closing(self._connect_manifest()) as connection:
+            if prefix:
+                names = connection.execute(
+                    'SELECT name FROM file WHERE basename >= ? AND basename < ?', (prefix, prefix + '\U0010ffff')
+                ).fetchall()
+            else:
+                names = connection.execute('SELECT name FROM file').fetchall()
+        for (name,) in names:
+            path = PurePath(name)
+            if path.name.endswith(suffix):
+                yield StoredFile(self, path, self._verbose_name(path))
+
+    def _walk_files(self) -> Generator[Path, None, None]:
+        """
+        :return: an iterator over the paths of all files in the storage
+        """
+        for path in Path(self.upload_to).iterdir():
+            if path.is_file() and not path.name.startswith(self.manifest_name):
+                yield path
+
+    def rebuild_index(self) -> int:
+        """Create the manifest of the files in the storage directory from
+        scratch, for directories that were filled without a manifest.
+
+        :return: the number of files in the manifest
+        """
+        self.available()
+        with closing(self._connect_manifest()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('DELETE FROM file')
+                connection.executemany(
+                    'INSERT OR REPLACE INTO file (name, basename) VALUES (?, ?)',
+                    ((self._process_path(PurePath(path)).as_posix(), path.name) for path in self._walk_files())
+                )
+                count = connection.execute('SELECT COUNT(*) FROM file').fetchone()[0]
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        logger.debug(f'rebuild manifest of {count} files in {self.upload_to}')
+        return count
 
     def _path(self, name: PurePath) -> PurePath:
         """Get the local filesystem path where the file can be opened using Python standard open
@@ -162,7 +262,53 @@ class Storage:
         like that. In each case the storage will choose the filename.
         """
         self.available()
-
+        return self._checkin(local_path, filename)
+
+    def checkin_many(self, local_paths: Iterable[Path], max_workers: int = 8,
+                     progress: Optional[Callable[[int, int], None]] = None
+                     ) -> Generator[Tuple[Path, StoredFile], None, None]:
+        """Check multiple files into the storage, copying them concurrently.
+
+        :param local_paths: the paths to the local files to check in
+        :param max_workers: the maximum number of files copied at the same time
+        :param progress: a function called with the number of files checked in
+            and the total number of files, each time a file has been checked in
+        :return: an iterator over tuples of the local path and the StoredFile,
+            in the order in which the files have been checked in.
+
+        If checking in a file fails, the exception is raised by the iterator,
+        and the files that have not been copied yet are skipped.  The files
+        that were checked in, but not returned by the iterator, are deleted.
+        """
+        local_paths = list(local_paths)
+        if not len(local_paths):
+            return
+        self.available()
+        with ThreadPoolExecutor(min(max_workers, len(local_paths)), thread_name_prefix='storage-checkin') as executor:
+            futures = {executor.submit(self._checkin, local_path): local_path for local_path in local_paths}
+            returned = set()
+            try:
+                for completed, future in enumerate(as_completed(futures), 1):
+                    stored_file = future.result()
+                    if progress is not None:
+                        progress(completed, len(local_paths))
+                    returned.add(future)
+                    yield futures[future], stored_file
+            finally:
+                for future in futures:
+                    future.cancel()
+                done, _not_done = wait(futures)
+                for future in done:
+                    if (future in returned) or future.cancelled() or (future.exception() is not None):
+                        continue
+                    stored_file = future.result()
+                    logger.debug(f'delete {stored_file.name}, it was not returned')
+                    try:
+                        self.delete(stored_file.name)
+                    except Exception as e:
+                        logger.warning(f'could not delete {stored_file.name}', exc_info=e)
+
+    def _checkin(self, local_path: Path, filename: PurePath = None) -> StoredFile:
         assert isinstance(local_path, Path)
         assert local_path.resolve(strict=True)
 
@@ -174,12 +320,12 @@ class Storage:
         root, extension = name.stem, name.suffix
 
         handle, to_path = self._create_tempfile_with_user_exceptions(extension, root)
-        os.close(handle)
 
         logger.debug(f'copy file from {local_path} to {to_path}')
-        shutil.copy(Path(local_path), Path(to_path))
-        filepath = self._process_path(PurePath(to_path))
-        return StoredFile(self, filepath, self._verbose_name(filepath, name.name))
+        with Path(local_path).open('rb', buffering=0) as source, os.fdopen(handle, 'wb') as destination:
+            content_hash, size = self._copy(source, destination, True)
+        shutil.copymode(Path(local_path), Path(to_path))
+        return self._checked_in(PurePath(to_path), name.name, content_hash, size)
 
     def checkin_stream(self, prefix: str, suffix: str, stream: IO) -> StoredFile:
         """Check the data stream as a file into the storage
@@ -201,16 +347,74 @@ class Storage:
         stored_file = storage.checkin_stream( 'document', '.txt', stream )
         """
         self.available()
+        return self._checkin_stream(prefix, suffix, stream)
+
+    def _checkin_stream(self, prefix: str, suffix: str, stream: IO) -> StoredFile:
         handle, to_path = self._create_tempfile_with_user_exceptions(suffix, prefix)
         logger.debug('checkin stream to %s', to_path)
 
         with os.fdopen(handle, 'wb') as file:
             logger.debug('opened file')
-            file.write(stream.read())
+            content_hash, size = self._copy(stream, file, False)
             logger.debug('written contents to file')
-            file.flush()
-        filepath = self._process_path(PurePath(to_path))
-        return StoredFile(self, filepath, self._verbose_name(filepath, (prefix or '') + (suffix or '')))
+        return self._checked_in(PurePath(to_path), (prefix or '') + (suffix or ''), content_hash, size)
+
+    def _checked_in(self, path: PurePath, name_hint: str, content_hash: Optional[str], size: int) -> StoredFile:
+        """Called when a file has been written into the storage, to construct
+        the StoredFile.
+
+        :param path: the path to which the file was written
+        :param name_hint: the name given to the file when it was checked in
+        """
+        filepath = self._process_path(path)
+        if self.indexed:
+            with closing(self._connect_manifest()) as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO file (name, basename) VALUES (?, ?)', (filepath.as_posix(), filepath.name)
+                )
+        return StoredFile(self, filepath, self._verbose_name(filepath, name_hint), content_hash, size)
+
+    def _copy(self, source: IO, destination: BinaryIO, real_files: bool) -> Tuple[Optional[str], int]:
+        """Copy the content of a stream to a file, using a buffer of a
+        bounded size.
+
+        :param source: the stream to copy from its current position
+        :param destination: the file to copy to
+        :param real_files: the source is an unbuffered file and both are files
+            on the file system, so when no hash is needed, the content can be
+            copied without reading it in memory.
+        :return: the content hash and the number of bytes copied
+        """
+        size = 0
+        if self.hash_algorithm is None:
+            content_hash = None
+            if real_files and hasattr(os, 'copy_file_range'):
+                source_fd, destination_fd = source.fileno(), destination.fileno()
+                try:
+                    while (copied := os.copy_file_range(source_fd, destination_fd, self.buffer_size)):
+                        size += copied
+                    return None, size
+                except OSError as e:
+                    # file systems might not support copying between them
+                    logger.debug('could not copy file range, fall back on buffered copy', exc_info=e)
+        else:
+            content_hash = hashlib.new(self.hash_algorithm)
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        while True:
+            if hasattr(source, 'readinto'):
+                length = source.readinto(buffer)
+                data = view[:length]
+            else:
+                data = source.read(self.buffer_size)
+                length = len(data)
+            if not length:
+                break
+            if content_hash is not None:
+                content_hash.update(data)
+            destination.write(data)
+            size += length
+        return (content_hash.hexdigest() if content_hash is not None else None), size
 
     def checkout(self, stored_file: StoredFile) -> Path:
         """Check the file out of the storage and return a local filesystem path
@@ -222,6 +426,20 @@ class Storage:
         self.available()
         return Path(self._path(stored_file.name))
 
+    def _checkout_name(self, name: PurePath) -> PurePath:
+        """
+        :return: the name of a file once it has been checked out
+        """
+        return name
+
+    def prefetch(self, stored_files: Iterable[StoredFile]):
+        """Hint that the files are likely to be checked out soon.  Storages
+        that keep a local copy of files can start fetching them.
+
+        :param stored_files: the StoredFile objects to fetch
+        """
+        pass
+
     # @contextmanager: NOTE: This should be a context manager so that the file always gets closed(doesn't happen now), good luck!
     def checkout_stream(self, stored_file: StoredFile) -> BinaryIO:
         """Check the file out of the storage as a data stream
@@ -231,6 +449,9 @@ class Storage:
         """
         assert isinstance(stored_file, StoredFile)
         self.available()
+        return self._checkout_stream(stored_file)
+
+    def _checkout_stream(self, stored_file: StoredFile) -> BinaryIO:
         return Path(self._path(stored_file.name)).open('rb')
 
     def delete(self, name: PurePath, recursive=False):
@@ -241,8 +462,17 @@ class Storage:
         path = Path(self._path(name))
         if recursive and os.path.isdir(path):
             shutil.rmtree(path)
+            if self.indexed:
+                with closing(self._connect_manifest()) as connection:
+                    directory = PurePath(name).as_posix() + '/'
+                    connection.execute(
+                        'DELETE FROM file WHERE name >= ? AND name < ?', (directory, directory + '\U0010ffff')
+                    )
         else:
             path.unlink(missing_ok=True)
+            if self.indexed:
+                with closing(self._connect_manifest()) as connection:
+                    connection.execute('DELETE FROM file WHERE name = ?', (PurePath(name).as_posix(),))
 
     def _process_path(self, path: PurePath) -> PurePath:
         return PurePath(os.path.relpath(path, start=self.upload_to))
@@ -273,5 +503,400 @@ class HashStorage(Storage):
         return PurePath(settings.CAMELOT_MEDIA_ROOT).joinpath(name)
 
     def list_files(self, prefix='', suffix=''):
+        if self.indexed:
+            return self._list_indexed_files(self.get_hashed_name(prefix) if prefix else '', suffix)
         # TODO user exception?
-        raise NotImplementedError("list_files is not implemented for HashStorage")
+        raise NotImplementedError("list_files is not implemented for HashStorage without index")
+
+    def _walk_files(self) -> Generator[Path, None, None]:
+        for directory in Path(self.upload_to).iterdir():
+            if directory.is_dir():
+                for path in directory.iterdir():
+                    if path.is_file():
+                        yield path
+
+
+class ContentStorage(Storage):
+    """
+    Storage that names files by the hash of their content, so a file that
+    is checked in multiple times is only stored once.  The files are sharded
+    into subdirectories by the first characters of their hash.
+
+    The number of references to each file is kept in an index in the storage
+    directory.  Deleting a file only removes a reference, the files without
+    references are removed by :meth:`collect_garbage`.
+    """
+
+    hash_algorithm = 'sha256'
+    index_name = '.references.sqlite'
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._connect_index(
+            self.index_name,
+            'CREATE TABLE IF NOT EXISTS reference (name TEXT PRIMARY KEY, count INTEGER NOT NULL)'
+        )
+
+    def _checked_in(self, path: PurePath, name_hint: str, content_hash: Optional[str], size: int) -> StoredFile:
+        assert content_hash is not None
+        # the suffix of the temporary file is random when the prefix has a dot
+        # and no suffix was requested
+        suffix = PurePath(name_hint).suffix if name_hint else ''
+        filepath = PurePath(content_hash[:2], content_hash[2:4], content_hash + suffix)
+        self.available(subdir=str(filepath.parent))
+        with closing(self._connect()) as connection:
+            # the index is locked while the file is moved, to prevent the
+            # garbage collection from removing it
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(
+                    'INSERT INTO reference (name, count) VALUES (?, 1) '
+                    'ON CONFLICT (name) DO UPDATE SET count = count + 1', (filepath.as_posix(),)
+                )
+                if Path(self._path(filepath)).exists():
+                    logger.debug(f'{filepath} is already stored')
+                    Path(path).unlink()
+                else:
+                    os.replace(path, self._path(filepath))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                Path(path).unlink(missing_ok=True)
+                raise
+        return StoredFile(self, filepath, self._verbose_name(filepath, name_hint), content_hash, size)
+
+    def list_files(self, prefix='', suffix='') -> Generator[StoredFile, None, None]:
+        with closing(self._connect()) as connection:
+            names = [name for (name,) in connection.execute('SELECT name FROM reference WHERE count > 0')]
+        for name in names:
+            path = PurePath(name)
+            if path.name.startswith(prefix) and path.name.endswith(suffix):
+                yield StoredFile(self, path, self._verbose_name(path))
+
+    def delete(self, name: PurePath, recursive=False):
+        """
+        Remove a reference to a file, the file itself is removed by the
+        garbage collection once there are no references left.
+        """
+        with closing(self._connect()) as connection:
+            connection.execute(
+                'UPDATE reference SET count = count - 1 WHERE name = ? AND count > 0', (PurePath(name).as_posix(),)
+            )
+
+    def collect_garbage(self) -> int:
+        """Remove the files that are no longer referenced
+
+        :return: the number of files removed
+        """
+        removed = 0
+        with closing(self._connect()) as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                names = [name for (name,) in connection.execute('SELECT name FROM reference WHERE count <= 0')]
+                for name in names:
+                    Path(self._path(PurePath(name))).unlink(missing_ok=True)
+                    connection.execute('DELETE FROM reference WHERE name = ?', (name,))
+                    removed += 1
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        logger.debug(f'removed {removed} unreferenced files')
+        return removed
+
+
+class CompressedStorage(Storage):
+    """
+    Storage that compresses files when they are checked in.  The name of a
+    compressed file ends with the suffix of the codec, files with other
+    names, including compressed files checked in by the user, are read as
+    they are, so existing files can remain in the storage.
+
+    Compressed files are decompressed while reading them with
+    :meth:`checkout_stream`.  A checked out file is decompressed in a local
+    cache, to be used as a file by other applications.
+    """
+
+    # the suffix of compressed files and the function to open them
+    codecs = {'.camelot-gz': gzip.open}
+    codec = '.camelot-gz'
+    # favor speed over compression ratio
+    compresslevel = 1
+
+    def __init__(self, upload_to: PurePath, indexed: bool = False,
+                 cache_directory: Optional[Path] = None, max_cache_size: int = 256 * 1024 * 1024):
+        """
+        :param cache_directory: the local directory to keep the decompressed
+            files, by default a directory in the temporary directory of the
+            system
+        :param max_cache_size: the maximum number of bytes of decompressed
+            files to keep
+        """
+        super().__init__(upload_to, indexed)
+        self._cache_directory = cache_directory
+        self.max_cache_size = max_cache_size
+        self._cache = None
+
+    def _create_tempfile(self, suffix: str, prefix: str) -> Tuple[int, str]:
+        return super()._create_tempfile((suffix or '') + self.codec, prefix)
+
+    def _copy(self, source: IO, destination: BinaryIO, real_files: bool) -> Tuple[Optional[str], int]:
+        with gzip.GzipFile(fileobj=destination, mode='wb', compresslevel=self.compresslevel, mtime=0) as compressed:
+            return super()._copy(source, compressed, False)
+
+    def _verbose_name(self, path: PurePath, name_hint: Optional[str] = None) -> str:
+        if path.suffix in self.codecs:
+            path = path.with_suffix('')
+        return super()._verbose_name(path, name_hint)
+
+    def _checkout_name(self, name: PurePath) -> PurePath:
+        if name.suffix in self.codecs:
+            return name.with_suffix('')
+        return name
+
+    def list_files(self, prefix='', suffix='') -> Generator[StoredFile, None, None]:
+        yield from super().list_files(prefix, suffix)
+        if suffix and (suffix not in self.codecs):
+            for codec in self.codecs:
+                yield from super().list_files(prefix, suffix + codec)
+
+    def checkout(self, stored_file: StoredFile) -> Path:
+        assert isinstance(stored_file, StoredFile)
+        if (stored_file.name.suffix not in self.codecs) or (not self.exists(stored_file.name)):
+            return super().checkout(stored_file)
+        if self._cache is None:
+            cache_directory = self._cache_directory
+            if cache_directory is None:
+                cache_directory = Path(
+                    tempfile.gettempdir(), 'camelot-decompressed', sha1(str(self.upload_to).encode('UTF-8')).hexdigest()
+                )
+            self._cache = CachedStorage(self, cache_directory, self.max_cache_size)
+        return self._cache.checkout(stored_file)
+
+    def _checkout_stream(self, stored_file: StoredFile) -> BinaryIO:
+        opener = self.codecs.get(stored_file.name.suffix)
+        if opener is None:
+            return super()._checkout_stream(stored_file)
+        return opener(Path(self._path(stored_file.name)), 'rb')
+
+
+class CachedStorage(Storage):
+    """
+    Wraps a storage, for example on a slow network share, and keeps a copy
+    of checked out files in a cache on the local disk.  The least recently
+    used files are removed from the cache when its size exceeds the maximum
+    size.
+
+    Files are assumed not to change once they have been checked in, so a
+    file in the cache is used without verifying the wrapped storage.  The
+    availability of the wrapped storage is only verified again after a
+    timeout, also when files are checked in or fetched.  Only the
+    subdirectories verified by the wrapped storage itself, such as those of
+    a :class:`HashStorage`, are verified each time.
+
+    A checked out file is used by the caller after :meth:`checkout` returns,
+    so files used less than :attr:`pin_time` seconds ago are not removed
+    from the cache, even when it exceeds its maximum size.
+    """
+
+    # the number of seconds a file in the cache is kept after it was used
+    pin_time = 300.0
+    # the maximum number of files waiting to be prefetched, other files are
+    # not prefetched
+    max_pending_prefetches = 64
+
+    def __init__(self, storage: Storage, cache_directory: Optional[Path] = None,
+                 max_cache_size: int = 1024 * 1024 * 1024, availability_ttl: float = 60.0,
+                 prefetch_workers: int = 2):
+        """
+        :param storage: the storage to wrap
+        :param cache_directory: the local directory to keep the files, by
+            default a directory in the temporary directory of the system
+        :param max_cache_size: the maximum number of bytes in the cache
+        :param availability_ttl: the number of seconds the availability
+            of the wrapped storage is remembered
+        :param prefetch_workers: the number of threads used to fetch files
+            in the background
+        """
+        super().__init__(storage._upload_to)
+        self.storage = storage
+        self._cache_directory = cache_directory
+        self.max_cache_size = max_cache_size
+        self.availability_ttl = availability_ttl
+        self.prefetch_workers = prefetch_workers
+        self._availability = dict()
+        # the names of the files in the cache directory with their size and
+        # the time they were last used, from least to most recently used,
+        # loaded when the cache is first used
+        self._cached_files = None
+        self._cache_size = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        # the names of the files waiting to be prefetched
+        self._pending_prefetches = set()
+
+    @property
+    def upload_to(self):
+        return self.storage.upload_to
+
+    @property
+    def cache_directory(self) -> Path:
+        if self._cache_directory is None:
+            self._cache_directory = Path(
+                tempfile.gettempdir(), 'camelot-storage', sha1(str(self.upload_to).encode('UTF-8')).hexdigest()
+            )
+        return Path(self._cache_directory)
+
+    def available(self, subdir: str = '') -> bool:
+        now = time.monotonic()
+        availability = self._availability.get(subdir)
+        if (availability is not None) and (now - availability[1] < self.availability_ttl):
+            return availability[0]
+        available = self.storage.available(subdir)
+        self._availability[subdir] = (available, now)
+        return available
+
+    def writeable(self) -> bool:
+        return self.storage.writeable()
+
+    def exists(self, name: PurePath) -> bool:
+        return self.storage.exists(name)
+
+    def list_files(self, prefix='', suffix='') -> Generator[StoredFile, None, None]:
+        return (self._wrap(stored_file) for stored_file in self.storage.list_files(prefix, suffix))
+
+    def rebuild_index(self) -> int:
+        return self.storage.rebuild_index()
+
+    def _checkin(self, local_path: Path, filename: PurePath = None) -> StoredFile:
+        return self._wrap(self.storage._checkin(local_path, filename))
+
+    def _checkin_stream(self, prefix: str, suffix: str, stream: IO) -> StoredFile:
+        return self._wrap(self.storage._checkin_stream(prefix, suffix, stream))
+
+    def checkout(self, stored_file: StoredFile) -> Path:
+        assert isinstance(stored_file, StoredFile)
+        return self._checkout(stored_file, True)
+
+    def _checkout(self, stored_file: StoredFile, pin: bool) -> Path:
+        """
+        :param pin: the file will be used by the caller, and should not be
+            removed from the cache for :attr:`pin_time` seconds
+        """
+        cache_path = self._cache_path(stored_file.name)
+        with self._lock:
+            self._load_cached_files()
+            cached = self._cached_files.get(cache_path.name)
+            if cached is not None:
+                if cache_path.exists():
+                    if pin:
+                        cached[1] = time.monotonic()
+                        self._cached_files.move_to_end(cache_path.name)
+                    return cache_path
+                self._cache_size -= self._cached_files.pop(cache_path.name)[0]
+        try:
+            self._fetch(stored_file, cache_path, pin)
+        except FileNotFoundError:
+            # like the other storages, return the path of a file that does
+            # not exist, instead of raising an exception
+            return self.storage.checkout(StoredFile(self.storage, stored_file.name, stored_file.verbose_name))
+        return cache_path
+
+    def checkout_stream(self, stored_file: StoredFile) -> BinaryIO:
+        return self.checkout(stored_file).open('rb')
+
+    def prefetch(self, stored_files: Iterable[StoredFile]):
+        to_fetch = []
+        with self._lock:
+            self._load_cached_files()
+            for stored_file in stored_files:
+                if len(self._pending_prefetches) >= self.max_pending_prefetches:
+                    logger.debug('too many pending prefetches, skip the others')
+                    break
+                name = self._cache_path(stored_file.name).name
+                if (name in self._cached_files) or (name in self._pending_prefetches):
+                    continue
+                self._pending_prefetches.add(name)
+                to_fetch.append(stored_file)
+            if len(to_fetch) and (self._executor is None):
+                self._executor = ThreadPoolExecutor(self.prefetch_workers, thread_name_prefix='storage-prefetch')
+        for stored_file in to_fetch:
+            self._executor.submit(self._prefetch, stored_file)
+
+    def delete(self, name: PurePath, recursive=False):
+        self.storage.delete(name, recursive)
+        cache_path = self._cache_path(PurePath(name))
+        with self._lock:
+            self._load_cached_files()
+            if cache_path.name in self._cached_files:
+                self._cache_size -= self._cached_files.pop(cache_path.name)[0]
+            cache_path.unlink(missing_ok=True)
+
+    def _wrap(self, stored_file: StoredFile) -> StoredFile:
+        return StoredFile(self, stored_file.name, stored_file.verbose_name, stored_file.content_hash, stored_file.size)
+
+    def _checkout_name(self, name: PurePath) -> PurePath:
+        return self.storage._checkout_name(name)
+
+    def _cache_path(self, name: PurePath) -> Path:
+        suffix = self._checkout_name(name).suffix
+        return self.cache_directory.joinpath(sha1(name.as_posix().encode('UTF-8')).hexdigest() + suffix)
+
+    def _load_cached_files(self):
+        """Register the files already in the cache directory, should be
+        called while holding the lock"""
+        if self._cached_files is not None:
+            return
+        self._cached_files = collections.OrderedDict()
+        self.cache_directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for path in self.cache_directory.iterdir():
+            if path.name.startswith('.fetch'):
+                # left behind by an interrupted fetch
+                path.unlink(missing_ok=True)
+            elif path.is_file():
+                paths.append((path.stat(), path.name))
+        for stat, name in sorted(paths, key=lambda path: path[0].st_atime):
+            # files from a previous session are not in use
+            self._cached_files[name] = [stat.st_size, float('-inf')]
+            self._cache_size += stat.st_size
+
+    def _fetch(self, stored_file: StoredFile, cache_path: Path, pin: bool):
+        """Copy a file from the wrapped storage into the cache"""
+        logger.debug(f'fetch {stored_file.name} into the cache')
+        self.available()
+        handle, temp_path = tempfile.mkstemp(prefix='.fetch', dir=self.cache_directory)
+        try:
+            with os.fdopen(handle, 'wb') as destination:
+                with self.storage._checkout_stream(StoredFile(self.storage, stored_file.name, stored_file.verbose_name)) as source:
+                    shutil.copyfileobj(source, destination, self.buffer_size)
+            os.replace(temp_path, cache_path)
+        except Exception:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        size = cache_path.stat().st_size
+        with self._lock:
+            now = time.monotonic()
+            self._cache_size -= self._cached_files.pop(cache_path.name, [0])[0]
+            self._cached_files[cache_path.name] = [size, now if pin else float('-inf')]
+            self._cache_size += size
+            # evict the least recently used files, unless they are still in
+            # use, since all other files are used more recently, stop there
+            while self._cache_size > self.max_cache_size:
+                name, (evicted_size, last_used) = next(iter(self._cached_files.items()))
+                if now - last_used < self.pin_time:
+                    break
+                del self._cached_files[name]
+                self._cache_size -= evicted_size
+                try:
+                    self.cache_directory.joinpath(name).unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f'could not remove {name} from the cache', exc_info=e)
+
+    def _prefetch(self, stored_file: StoredFile):
+        try:
+            self._checkout(stored_file, False)
+        except Exception as e:
+            logger.warning(f'could not prefetch {stored_file.name}', exc_info=e)
+        finally:
+            with self._lock:
+                self._pending_prefetches.discard(self._cache_path(stored_file.name).name)
@@ -34,7 +34,7 @@ of `QObject`, but pure Python helper classes.
 """
 
 from ..qt import Qt
-from .proxy import AbstractModelProxy, AbstractModelFilter
+from .proxy import AbstractModelProxy, AbstractModelFilter, merge_ranges
 
 #
 # Custom Roles
@@ -76,5 +76,6 @@ __all__ = [
     AbstractModelFilter.__name__,
     AbstractModelProxy.__name__,
     ProxyDict.__name__,
+    merge_ranges.__name__,
 ]
 
@@ -52,6 +52,27 @@ by the proxy will stay at this index, even when the model has changed.
 """
 
 
+def merge_ranges(ranges):
+    """
+    Turn a list of row ranges into an ordered interval set.
+
+    :param ranges: an iterable of `(first_row, last_row)` tuples, the last row
+        being included in the range.
+    :return: a list of sorted, non overlapping and non adjacent
+        `(first_row, last_row)` tuples covering the same rows.
+    """
+    merged_ranges = []
+    for first_row, last_row in sorted(ranges):
+        if last_row < first_row:
+            continue
+        if len(merged_ranges) and (first_row <= merged_ranges[-1][1] + 1):
+            if last_row > merged_ranges[-1][1]:
+                merged_ranges[-1] = (merged_ranges[-1][0], last_row)
+        else:
+            merged_ranges.append((first_row, last_row))
+    return merged_ranges
+
+
 class AbstractModelFilter(object):
 
     def filter(self, it, value):
@@ -116,12 +137,60 @@ class AbstractModelProxy(object):
         """
         raise NotImplementedError()
 
+    def extend(self, objects):
+        """
+        Add a list of objects to the proxy and the model.  Concrete
+        proxies can overwrite this method to add the objects at once,
+        instead of one by one.
+        """
+        for obj in objects:
+            self.append(obj)
+
+    def referenced_objects(self):
+        """
+        The objects to which the proxy holds a reference, to prevent them from
+        being pruned from the session.  Concrete proxies that know those
+        objects can overwrite this method.
+
+        :return: an iterable of objects, or `None` if they are unknown
+        """
+        return None
+
     def remove(self, obj):
         """
         Remove an object from the proxy and the model
         """
         raise NotImplementedError()
 
+    def remove_many(self, objects):
+        """
+        Remove a list of objects from the proxy and the model.  Concrete
+        proxies can overwrite this method to remove the objects at once,
+        instead of one by one.
+        """
+        for obj in objects:
+            self.remove(obj)
+
+    def get_ranges(self, ranges, yield_per=None):
+        """
+        :param ranges: an interval set as returned by :func:`merge_ranges`
+        :param yield_per: an integer number giving a hint on how many objects
+            should fetched from the model at the same time
+
+        :return: an iterator over the objects in the ranges
+
+        By default each range is sliced from the proxy, in slices of at most
+        `yield_per` indexes, a `yield_per` that is not positive is ignored.
+        Concrete proxies can overwrite this method to fetch multiple ranges
+        at once.
+        """
+        if (yield_per is not None) and (yield_per <= 0):
+            yield_per = None
+        for first_row, last_row in ranges:
+            step = (last_row - first_row + 1) if yield_per is None else yield_per
+            for offset in range(first_row, last_row + 1, step):
+                yield from self.__getitem__(slice(offset, min(offset + step, last_row + 1)), yield_per)
+
     def index(self, obj):
         """
         Return the index holding the object in the proxy
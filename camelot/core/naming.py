@@ -1017,9 +1017,11 @@ class EntityNamingContext(EndpointNamingContext):
             NamingException NamingException.Message.invalid_name: when the name is invalid.
             NameNotFoundException NamingException.Message.name_not_found: if no binding was found for the given name.
         """
+        from camelot.core.orm.cache import readonly_entity_cache
         name = self.get_composite_name(name)
         session = orm.session._sessions.get(int(name[0]))
-        instance = session.query(self.entity).get(name[1:]) if session is not None else None
+        primary_key = tuple(int(name_part) for name_part in name[1:])
+        instance = readonly_entity_cache.get(session, self.entity, primary_key) if session is not None else None
         if instance is None:
             raise NameNotFoundException(name[0], BindingType.named_object)
         return instance
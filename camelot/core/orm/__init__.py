@@ -48,7 +48,7 @@ import logging
 LOGGER = logging.getLogger('camelot.core.orm')
 
 from camelot.core.sql import metadata
-from sqlalchemy import orm
+from sqlalchemy import and_, case, inspect, orm, tuple_
 from sqlalchemy.ext.declarative import declarative_base
 
 from sqlalchemy.orm import scoped_session, sessionmaker
@@ -83,6 +83,8 @@ entities = EntityCollection()
 
 
 from . entity import EntityBase, EntityMeta
+from . cache import readonly_entity_cache
+from . hygiene import session_hygiene
 
 
 def setup_all( create_tables=False, *args, **kwargs ):
@@ -110,7 +112,203 @@ def transaction( original_function ):
     
     return decorated_function
 
+def load_many_to_one( objects, key, chunk_size = 500 ):
+    """Load the objects related to a list of objects through a many to one
+    relationship, using a single query per chunk of related objects, instead
+    of a lazy load for each object.  The loaded objects are set as the
+    committed value of the relationship, so accessing the relationship on the
+    objects afterwards does not query the database.
+
+    Objects that are not mapped, or for which the relationship is not a simple
+    many to one relationship referring to a primary key are ignored.
+
+    :param objects: an iterable of mapped objects
+    :param key: the name of the many to one relationship
+    :param chunk_size: the maximum number of related objects to query at once
+    :return: a list with the related objects that were found
+    """
+    parents = []
+    primary_keys_by_target = dict()
+    for obj in objects:
+        state = inspect( obj, raiseerr = False )
+        if state is None or state.session is None or key not in state.unloaded:
+            continue
+        prop = state.mapper.get_property( key )
+        if not isinstance( prop, orm.RelationshipProperty ) or \
+           prop.direction != orm.interfaces.MANYTOONE or \
+           prop.secondary is not None:
+            continue
+        target_mapper = prop.mapper
+        remote_columns = [remote for _local, remote in prop.local_remote_pairs]
+        if set( remote_columns ) != set( target_mapper.primary_key ):
+            continue
+        local_by_remote = dict( ( remote, local ) for local, remote in prop.local_remote_pairs )
+        local_keys = [ state.mapper.get_property_by_column( local_by_remote[column] ).key
+                       for column in target_mapper.primary_key ]
+        primary_key = tuple( getattr( obj, local_key ) for local_key in local_keys )
+        if None in primary_key:
+            continue
+        identity_key = target_mapper.identity_key_from_primary_key( primary_key )
+        parents.append( ( obj, state.session, identity_key ) )
+        if identity_key in state.session.identity_map:
+            continue
+        primary_keys = primary_keys_by_target.setdefault( ( state.session, target_mapper ), set() )
+        primary_keys.add( primary_key )
+    # the identity map only holds weak references, so the loaded objects
+    # should be referenced until they are set on the parents
+    loaded = dict()
+    for ( session, target_mapper ), primary_keys in primary_keys_by_target.items():
+        cached, primary_keys = readonly_entity_cache.seed( session, target_mapper, list( primary_keys ) )
+        for identity_key, target in cached.items():
+            loaded[ ( session, identity_key ) ] = target
+        primary_key_columns = target_mapper.primary_key
+        for i in range( 0, len( primary_keys ), chunk_size ):
+            chunk = primary_keys[i:i+chunk_size]
+            if len( primary_key_columns ) == 1:
+                condition = primary_key_columns[0].in_( [pk[0] for pk in chunk] )
+            else:
+                condition = tuple_( *primary_key_columns ).in_( chunk )
+            LOGGER.debug( 'load {} related {} objects'.format( len( chunk ), target_mapper.class_.__name__ ) )
+            for target in session.query( target_mapper ).filter( condition ):
+                loaded[ ( session, inspect( target ).key ) ] = target
+    targets = []
+    for obj, session, identity_key in parents:
+        target = loaded.get( ( session, identity_key ) )
+        if target is None:
+            target = session.identity_map.get( identity_key )
+        if target is None:
+            continue
+        orm.attributes.set_committed_value( obj, key, target )
+        targets.append( target )
+    return targets
+
+def bulk_delete( objects, chunk_size = 500 ):
+    """Delete a list of persistent objects with a single DELETE statement per
+    chunk of objects, instead of a statement for each object.  The deleted
+    objects are expunged from their session afterwards.
+
+    This bypasses the ORM cascades and events, so it should only be used for
+    objects of which the deletion has no side effects beyond removing their
+    rows.  Objects mapped with joined table inheritance are marked for deletion
+    in their session instead, to be deleted when the session is flushed.
+    Pending objects are expunged from their session, and objects that are
+    not in a session are ignored.
+
+    :param objects: an iterable of mapped objects
+    :param chunk_size: the maximum number of objects to delete at once
+    """
+    objects_by_mapper = dict()
+    for obj in objects:
+        state = inspect( obj )
+        mapper = state.mapper
+        if state.pending:
+            state.session.expunge( obj )
+            continue
+        if not state.persistent:
+            continue
+        if mapper.local_table is not mapper.base_mapper.local_table:
+            state.session.delete( obj )
+            continue
+        objects_by_mapper.setdefault( ( state.session, mapper ), [] ).append( obj )
+    for ( session, mapper ), mapper_objects in objects_by_mapper.items():
+        primary_key_columns = mapper.primary_key
+        for i in range( 0, len( mapper_objects ), chunk_size ):
+            chunk = mapper_objects[i:i+chunk_size]
+            primary_keys = [ mapper.primary_key_from_instance( obj ) for obj in chunk ]
+            if len( primary_key_columns ) == 1:
+                condition = primary_key_columns[0].in_( [pk[0] for pk in primary_keys] )
+            else:
+                condition = tuple_( *primary_key_columns ).in_( primary_keys )
+            LOGGER.debug( 'delete {} {} objects'.format( len( chunk ), mapper.class_.__name__ ) )
+            session.query( mapper ).filter( condition ).delete( synchronize_session = False )
+            for obj in chunk:
+                session.expunge( obj )
+
+def bulk_update( objects, key, value, chunk_size = 500 ):
+    """Set an attribute of a list of persistent objects to the same value,
+    with a single UPDATE statement per chunk of objects, instead of a statement
+    for each object.  The attribute of the objects in the identity map is set
+    to the new value afterwards, without marking the objects as modified.
+
+    When the objects have a version column, its value is increased by the
+    same statement, and the statement only updates the objects of which the
+    version did not change, as when the objects would have been flushed.
+
+    This bypasses the ORM validators and events, so only objects of which the
+    attribute is mapped to a single column are updated with a statement.  The
+    attribute of other objects, or objects with validators or listeners on
+    the attribute, is set as usual, to be updated when the session is flushed.
+
+    :param objects: an iterable of mapped objects
+    :param key: the name of the attribute
+    :param value: the new value of the attribute
+    :param chunk_size: the maximum number of objects to update at once
+    """
+    objects_by_mapper = dict()
+    for obj in objects:
+        state = inspect( obj )
+        mapper = state.mapper
+        prop = mapper.get_property( key )
+        if not state.persistent or state.modified or \
+           not isinstance( prop, orm.ColumnProperty ) or len( prop.columns ) != 1 or \
+           mapper.local_table is not mapper.base_mapper.local_table or \
+           key in mapper.validators or mapper.class_manager[key].dispatch.set or \
+           not _bulk_versionable( mapper, prop ):
+            setattr( obj, key, value )
+            continue
+        objects_by_mapper.setdefault( ( state.session, mapper ), [] ).append( obj )
+    for ( session, mapper ), mapper_objects in objects_by_mapper.items():
+        primary_key_columns = mapper.primary_key
+        column = mapper.get_property( key ).columns[0]
+        version_column = mapper.version_id_col
+        for i in range( 0, len( mapper_objects ), chunk_size ):
+            chunk = mapper_objects[i:i+chunk_size]
+            primary_keys = [ mapper.primary_key_from_instance( obj ) for obj in chunk ]
+            if len( primary_key_columns ) == 1:
+                condition = primary_key_columns[0].in_( [pk[0] for pk in primary_keys] )
+            else:
+                condition = tuple_( *primary_key_columns ).in_( primary_keys )
+            values = { column: value }
+            if version_column is not None:
+                version_key = mapper.get_property_by_column( version_column ).key
+                primary_key_column = primary_key_columns[0]
+                old_versions = [ getattr( obj, version_key ) for obj in chunk ]
+                new_versions = [ mapper.version_id_generator( version ) for version in old_versions ]
+                condition = and_( condition, version_column == case(
+                    dict( ( pk[0], version ) for pk, version in zip( primary_keys, old_versions ) ),
+                    value = primary_key_column
+                ) )
+                values[version_column] = case(
+                    dict( ( pk[0], version ) for pk, version in zip( primary_keys, new_versions ) ),
+                    value = primary_key_column
+                )
+            LOGGER.debug( 'update {} of {} {} objects'.format( key, len( chunk ), mapper.class_.__name__ ) )
+            updated = session.query( mapper ).filter( condition ).update( values, synchronize_session = False )
+            if version_column is not None and updated != len( chunk ):
+                raise orm.exc.StaleDataError(
+                    'UPDATE of {} expected to update {} rows, updated {}'.format(
+                        mapper.class_.__name__, len( chunk ), updated
+                    )
+                )
+            for j, obj in enumerate( chunk ):
+                orm.attributes.set_committed_value( obj, key, value )
+                if version_column is not None:
+                    orm.attributes.set_committed_value( obj, version_key, new_versions[j] )
+
+def _bulk_versionable( mapper, prop ):
+    """
+    :return: `True` if the version of the objects of a mapper can be
+        increased by :func:`bulk_update` when the property is updated
+    """
+    version_column = mapper.version_id_col
+    if version_column is None:
+        return True
+    return mapper.version_id_generator is not False and \
+           len( mapper.primary_key ) == 1 and \
+           version_column not in prop.columns
 
 __all__ = [obj.__name__ for obj in [Entity, EntityBase, EntityMeta,
-                                    EntityCollection, setup_all, transaction
-                                    ]] + ['Session', 'entities']
+                                    EntityCollection, bulk_delete, bulk_update,
+                                    load_many_to_one, setup_all, transaction
+                                    ]] + ['Session', 'entities', 'readonly_entity_cache',
+                                         'session_hygiene']
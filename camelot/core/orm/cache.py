@@ -0,0 +1,196 @@
+#  ============================================================================
+#
+#  Copyright (C) 2007-2016 Conceptive Engineering bvba.
+#  www.conceptive.be / info@conceptive.be
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+#      * Redistributions of source code must retain the above copyright
+#        notice, this list of conditions and the following disclaimer.
+#      * Redistributions in binary form must reproduce the above copyright
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+#      * Neither the name of Conceptive Engineering nor the
+#        names of its contributors may be used to endorse or promote products
+#        derived from this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+#  ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+#  DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+#  (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+#  LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+#  ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+#  SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+#  ============================================================================
+"""
+A process wide cache for the instances of readonly entities, shared by all
+sessions.
+
+Since the instances of readonly entities never change, the column values
+of those instances can be kept after they have been loaded once in any
+session.  When an instance is needed again in another session, it is put in
+the identity map of that session from the cache, without a query.
+
+The cache is only consulted by :meth:`ReadonlyEntityCache.get`, and thus by
+the entity naming context, and by :func:`camelot.core.orm.load_many_to_one`.
+`Query.get` and lazy loads do not consult the cache themselves, but they
+check the identity map first.  The identity map only holds weak references,
+so those lookups are resolved without a query as long as the instances put
+in the session from the cache are used, for example as the related objects
+set by `load_many_to_one`.
+
+The cache is only filled once it has been installed on an entity base class ::
+
+    readonly_entity_cache.install( Entity )
+
+When reference data is reloaded, the cache should be invalidated ::
+
+    readonly_entity_cache.invalidate( Country )
+"""
+
+import collections
+import logging
+import threading
+
+from sqlalchemy import event, inspect, orm
+
+LOGGER = logging.getLogger('camelot.core.orm.cache')
+
+class ReadonlyEntityCache( object ):
+    """
+    :param max_entries: the maximum number of instances in the cache, the
+        least recently used instances are removed first.
+    """
+
+    def __init__( self, max_entries = 10000 ):
+        self.max_entries = max_entries
+        self.installed = False
+        self.hits = 0
+        self.misses = 0
+        # identity key -> (mapper, column values)
+        self._values = collections.OrderedDict()
+        self._readonly_mappers = dict()
+        self._lock = threading.Lock()
+
+    def install( self, entity_base ):
+        """Start caching the loaded instances of the readonly subclasses of
+        an entity base class"""
+        if not self.installed:
+            event.listen( entity_base, 'load', self._loaded, propagate = True )
+            self.installed = True
+
+    def is_readonly( self, mapper ):
+        """
+        :return: `True` if the instances of the mapper are cached
+        """
+        readonly = self._readonly_mappers.get( mapper )
+        if readonly is None:
+            from vfinance.data.types import data_status_types
+            readonly = getattr( mapper.class_, '__status__', None ) == data_status_types.readonly
+            self._readonly_mappers[mapper] = readonly
+        return readonly
+
+    def _loaded( self, obj, context ):
+        state = inspect( obj )
+        if not self.is_readonly( state.mapper ):
+            return
+        column_keys = state.mapper.column_attrs.keys()
+        values = dict( ( key, state.dict[key] ) for key in column_keys if key in state.dict )
+        with self._lock:
+            self._values[state.key] = ( state.mapper, values )
+            self._values.move_to_end( state.key )
+            while len( self._values ) > self.max_entries:
+                self._values.popitem( last = False )
+
+    def _merge( self, session, identity_key ):
+        """
+        Put the cached instance of an identity key in a session.
+
+        :return: the instance in the session, or `None` if it is not cached
+        """
+        with self._lock:
+            cached = self._values.get( identity_key )
+            if cached is None:
+                self.misses += 1
+                return None
+            self._values.move_to_end( identity_key )
+            self.hits += 1
+        mapper, values = cached
+        obj = mapper.class_manager.new_instance()
+        for key, value in values.items():
+            orm.attributes.set_committed_value( obj, key, value )
+        orm.make_transient_to_detached( obj )
+        return session.merge( obj, load = False )
+
+    def get( self, session, cls, primary_key ):
+        """Get an instance by its primary key, from the session, the cache or
+        the database, in that order.
+
+        :param primary_key: a tuple with the primary key
+        :return: the instance or `None` if it does not exist
+        """
+        mapper = orm.class_mapper( cls )
+        identity_key = mapper.identity_key_from_primary_key( primary_key )
+        obj = session.identity_map.get( identity_key )
+        if obj is None and self.installed and self.is_readonly( mapper ):
+            obj = self._merge( session, identity_key )
+            # the cached instance might be of an unrelated subclass
+            if obj is not None and not isinstance( obj, cls ):
+                return None
+        if obj is None:
+            obj = session.query( cls ).get( primary_key )
+        return obj
+
+    def seed( self, session, mapper, primary_keys ):
+        """Put the cached instances of a list of primary keys in the identity
+        map of a session.
+
+        :return: a tuple with a dict of the identity keys and the instances
+            that were cached, and a list of the primary keys of which the
+            instances were not cached
+        """
+        found = dict()
+        if not ( self.installed and self.is_readonly( mapper ) ):
+            return found, primary_keys
+        missing = []
+        for primary_key in primary_keys:
+            identity_key = mapper.identity_key_from_primary_key( primary_key )
+            obj = self._merge( session, identity_key )
+            if obj is None:
+                missing.append( primary_key )
+            else:
+                found[identity_key] = obj
+        return found, missing
+
+    def invalidate( self, cls = None ):
+        """Remove the instances of an entity class and its subclasses from the
+        cache, or all instances if no class is given.  This does not affect
+        the instances already in a session."""
+        with self._lock:
+            if cls is None:
+                self._values.clear()
+            else:
+                base_cls = orm.class_mapper( cls ).base_mapper.class_
+                for identity_key, ( mapper, _values ) in list( self._values.items() ):
+                    if identity_key[0] is base_cls and issubclass( mapper.class_, cls ):
+                        del self._values[identity_key]
+        LOGGER.debug( 'invalidated cached instances of {}'.format( cls ) )
+
+    @property
+    def hit_rate( self ):
+        """
+        :return: the fraction of lookups in the cache that found an instance,
+            `None` if there were no lookups yet
+        """
+        lookups = self.hits + self.misses
+        if lookups:
+            return self.hits / lookups
+
+    def __len__( self ):
+        return len( self._values )
+
+readonly_entity_cache = ReadonlyEntityCache()
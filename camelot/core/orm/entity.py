@@ -35,10 +35,14 @@ These classes can be reused if a custom base class is needed.
 """
 
 import datetime
+import decimal
+import enum
 import functools
+import json
 import logging
+import operator
 
-from sqlalchemy import orm, schema
+from sqlalchemy import inspect, orm, schema
 from sqlalchemy.orm.decl_api import ( _declarative_constructor,
                                       DeclarativeMeta )
 
@@ -55,6 +59,31 @@ class EnumerationColumnTypeMixin(object):
     Might be removed in the future, when all row types are IntEnum based.
     """
 
+class EntityMetadata( object ):
+    """
+    Metadata of an entity class that is computed once, when it is first
+    needed.
+    """
+
+    __slots__ = ( 'endpoint', 'polymorphic_types', 'discriminator_getter' )
+
+    def __init__( self, polymorphic_types ):
+        self.endpoint = None
+        self.polymorphic_types = polymorphic_types
+        # a function returning the discriminator value of an instance
+        self.discriminator_getter = None
+
+    @staticmethod
+    def compile_getter( attributes ):
+        """
+        :return: a function that returns a tuple with the values of the
+            attributes of an instance
+        """
+        getter = operator.attrgetter( *[attribute.key for attribute in attributes] )
+        if len( attributes ) == 1:
+            return lambda instance: ( getter( instance ), )
+        return getter
+
 class EntityMeta( DeclarativeMeta ):
     """
     Specialized metaclass for Entity classes that inherits from :class:`sqlalchmey.ext.declarative.DeclarativeMeta`.
@@ -139,10 +168,27 @@ class EntityMeta( DeclarativeMeta ):
 
         return _class
 
+    def _get_entity_metadata(cls):
+        # the metadata is stored in the class itself, and not inherited
+        metadata = cls.__dict__.get('_entity_metadata')
+        if metadata is None:
+            metadata = EntityMetadata(cls._get_polymorphic_types())
+            type.__setattr__(cls, '_entity_metadata', metadata)
+        return metadata
+
     @property
     def endpoint(cls):
-        from vfinance.model.endpoint import Endpoint
-        return Endpoint.get(cls)
+        metadata = cls._get_entity_metadata()
+        if metadata.endpoint is None:
+            from vfinance.model.endpoint import Endpoint
+            endpoint = Endpoint.get(cls)
+            # an endpoint might not be registered yet
+            if endpoint is None:
+                return None
+            if endpoint.discriminator is not None:
+                metadata.discriminator_getter = EntityMetadata.compile_getter(endpoint.discriminator)
+            metadata.endpoint = endpoint
+        return metadata.endpoint
 
     def get_polymorphic_types(cls):
         """
@@ -151,6 +197,9 @@ class EntityMeta( DeclarativeMeta ):
         Note: a class which both defines the polymorphic on as a polymoprhic identity,
         is not considered a polymorphic base class.
         """
+        return cls._get_entity_metadata().polymorphic_types
+
+    def _get_polymorphic_types(cls):
         polymorphic_on = cls.__mapper_args__.get('polymorphic_on')
         polymorphic_identity = cls.__mapper_args__.get('polymorphic_identity')
         if polymorphic_on is not None and polymorphic_identity is None:
@@ -167,15 +216,16 @@ class EntityMeta( DeclarativeMeta ):
         """Return the given entity instance's discriminator value."""
         assert isinstance(entity_instance, cls)
         if cls.endpoint.discriminator is not None:
-            return tuple([discriminator_prop.__get__(entity_instance, None) for discriminator_prop in cls.endpoint.discriminator])
+            return cls._get_entity_metadata().discriminator_getter(entity_instance)
 
     def set_discriminator_value(cls, entity_instance, primary_discriminator_value, *secondary_discriminator_values):
         """Set the given entity instance's discriminator with the provided discriminator value."""
         assert isinstance(entity_instance, cls)
-        if cls.endpoint.discriminator is not None:
-            (primary_discriminator, *secondary_discriminators) = cls.endpoint.discriminator
+        endpoint = cls.endpoint
+        if endpoint.discriminator is not None:
+            (primary_discriminator, *secondary_discriminators) = endpoint.discriminator
             if primary_discriminator_value is not None:
-                assert primary_discriminator_value in cls.endpoint.discriminator_types.__members__, '{} is not a valid discriminator value for this entity.'.format(primary_discriminator_value)
+                assert primary_discriminator_value in endpoint.discriminator_types.__members__, '{} is not a valid discriminator value for this entity.'.format(primary_discriminator_value)
                 primary_discriminator.__set__(entity_instance, primary_discriminator_value)
                 for secondary_discriminator_prop, secondary_discriminator_value in zip(secondary_discriminators, secondary_discriminator_values):
                     entity = secondary_discriminator_prop.prop.entity.entity
@@ -201,8 +251,10 @@ class EntityMeta( DeclarativeMeta ):
 # to reuse them in parts unrelated to EntityBase
 #
 
-def update_or_create_entity( cls, data, session, surrogate = True):
-    mapper = orm.class_mapper( cls )
+def _data_mapper( mapper, data ):
+    """
+    :return: the mapper of the polymorphic subclass to which the data belongs
+    """
     if mapper.polymorphic_on is not None:
         # assume the mapper is polymorphic on a column, otherwise we're unable
         # to deserialize it anyway
@@ -214,30 +266,111 @@ def update_or_create_entity( cls, data, session, surrogate = True):
             # we can only select a subclass if the polymporthic identifier is
             # in the data and that identifier is known to the mapper
             pass
-        cls = mapper.class_
+    return mapper
 
+def _data_primary_key( mapper, data ):
+    """
+    :return: the primary key tuple in the data, or `None` if some of the
+        primary key is missing
+    """
     pk_props = mapper.primary_key
-
     # if all pk are present and not None
     if not [1 for p in pk_props if data.get( p.key ) is None]:
-        pk_tuple = tuple( [data[prop.key] for prop in pk_props] )
-        record = session.query.get(pk_tuple)
+        return tuple( [data[prop.key] for prop in pk_props] )
+
+def update_or_create_entity( cls, data, session, surrogate = True, prefetched = None ):
+    """
+    :param prefetched: a dict with the identity keys that were looked up in
+        the database beforehand, and the record of each key, or `None` if the
+        record does not exist.  Records created for those keys are added to
+        the dict.
+    """
+    mapper = _data_mapper( orm.class_mapper( cls ), data )
+    cls = mapper.class_
+
+    pk_tuple = _data_primary_key( mapper, data )
+    if pk_tuple is not None:
+        identity_key = mapper.identity_key_from_primary_key( pk_tuple )
+        if prefetched is not None and identity_key in prefetched:
+            record = prefetched[identity_key]
+        else:
+            record = session.query( cls ).get( pk_tuple )
         if record is None:
             record = cls(_session=session)
+            if prefetched is not None and identity_key in prefetched:
+                prefetched[identity_key] = record
     else:
         if surrogate:
             record = cls(_session=session)
         else:
             raise Exception("cannot create non surrogate without pk")
-    dict_to_entity( record, data )
+    dict_to_entity( record, data, prefetched )
     return record
 
-def dict_to_entity( entity, data ):
+def _collect_primary_keys( mapper, data, primary_keys ):
+    """Collect the primary keys in nested data, grouped by base mapper"""
+    mapper = _data_mapper( mapper, data )
+    pk_tuple = _data_primary_key( mapper, data )
+    if pk_tuple is not None:
+        primary_keys.setdefault( mapper.base_mapper, set() ).add( pk_tuple )
+    for key, value in data.items():
+        if isinstance( value, dict ):
+            _collect_primary_keys( mapper.get_property(key).mapper, value, primary_keys )
+        elif isinstance(value, list) and value and isinstance(value[0], dict):
+            rel_mapper = mapper.get_property(key).mapper
+            for row in value:
+                if isinstance( row, dict ):
+                    _collect_primary_keys( rel_mapper, row, primary_keys )
+
+def update_or_create_many( cls, rows, session, surrogate = True, chunk_size = 500, flush_every = None ):
+    """Update or create records for a list of JSON-style nested dict/list
+    structures, like :func:`update_or_create_entity`.
+
+    The existing records of all primary keys in the data, including those
+    of nested data, are loaded beforehand with one query per chunk of
+    primary keys for each mapper, instead of one query per record.
+
+    :param chunk_size: the maximum number of primary keys queried at once
+    :param flush_every: flush the session each time this number of rows
+        has been processed, `None` to leave flushing to the caller
+    :return: a list with a record for each row
+    """
+    from sqlalchemy import tuple_
+    rows = list( rows )
+    primary_keys = dict()
+    for data in rows:
+        _collect_primary_keys( orm.class_mapper( cls ), data, primary_keys )
+    # keep the prefetched records referenced, since the identity map of the
+    # session only holds weak references to them
+    prefetched = dict()
+    for base_mapper, pk_tuples in primary_keys.items():
+        pk_columns = base_mapper.primary_key
+        pk_tuples = list( pk_tuples )
+        for i in range( 0, len( pk_tuples ), chunk_size ):
+            chunk = pk_tuples[i:i+chunk_size]
+            if len( pk_columns ) == 1:
+                condition = pk_columns[0].in_( [pk_tuple[0] for pk_tuple in chunk] )
+            else:
+                condition = tuple_( *pk_columns ).in_( chunk )
+            LOGGER.debug( 'prefetch {} {} records'.format( len( chunk ), base_mapper.class_.__name__ ) )
+            prefetched.update( ( base_mapper.identity_key_from_primary_key( pk_tuple ), None ) for pk_tuple in chunk )
+            for record in session.query( base_mapper ).filter( condition ):
+                prefetched[inspect( record ).key] = record
+    records = []
+    for i, data in enumerate( rows, 1 ):
+        records.append( update_or_create_entity( cls, data, session, surrogate, prefetched ) )
+        if flush_every and ( i % flush_every == 0 ):
+            session.flush()
+    return records
+
+def dict_to_entity( entity, data, prefetched = None ):
     """Update a mapped object with data from a JSON-style nested dict/list
     structure.
 
     :param entity: the Entity object into which to store the data
     :param data: a `dict` with data to store into the entity
+    :param prefetched: passed to :func:`update_or_create_entity` for nested
+        data
     """
     # surrogate can be guessed from autoincrement/sequence but I guess
     # that's not 100% reliable, so we'll need an override
@@ -255,9 +388,9 @@ def dict_to_entity( entity, data ):
             # already has a value, update that record.
             if not [1 for p in pk_props if p.key in data] and \
                dbvalue is not None:
-                dict_to_entity( dbvalue, value )
+                dict_to_entity( dbvalue, value, prefetched )
             else:
-                record = update_or_create_entity( rel_class, value, session,)
+                record = update_or_create_entity( rel_class, value, session, prefetched=prefetched )
                 setattr(entity, key, record)
         elif isinstance(value, list) and \
              value and isinstance(value[0], dict):
@@ -269,7 +402,7 @@ def dict_to_entity( entity, data ):
                     raise Exception(
                         'Cannot send mixed (dict/non dict) data '
                         'to list relationships in from_dict data.')
-                record = update_or_create_entity( rel_class, row,  session)
+                record = update_or_create_entity( rel_class, row,  session, prefetched=prefetched )
                 new_attr_value.append(record)
             setattr(entity, key, new_attr_value)
         else:
@@ -284,8 +417,7 @@ def entity_to_dict( entity, deep = {}, exclude = [], deep_primary_key=False ):
 
     mapper = orm.object_mapper( entity )
 
-    col_prop_names = [p.key for p in mapper.iterate_properties \
-                      if isinstance(p, orm.properties.ColumnProperty)]
+    col_prop_names = _column_property_names( mapper )
     data = dict([(name, getattr(entity, name))
                  for name in col_prop_names if name not in exclude])
     for rname, rdeep in deep.items():
@@ -305,6 +437,77 @@ def entity_to_dict( entity, deep = {}, exclude = [], deep_primary_key=False ):
 
     return data    
 
+_column_property_names_cache = dict()
+
+def _column_property_names( mapper ):
+    """
+    :return: the names of the column properties of a mapper
+    """
+    names = _column_property_names_cache.get( mapper )
+    if names is None:
+        names = [p.key for p in mapper.iterate_properties \
+                 if isinstance(p, orm.properties.ColumnProperty)]
+        _column_property_names_cache[mapper] = names
+    return names
+
+def _deep_loader_options( mapper, deep, path = () ):
+    """
+    :return: a list of `selectinload` options to load the relationships
+        in a `deep` specification of :func:`entity_to_dict`
+    """
+    options = []
+    for rname, rdeep in deep.items():
+        rpath = path + ( getattr( mapper.class_, rname ), )
+        if rdeep:
+            options.extend( _deep_loader_options( mapper.get_property( rname ).mapper, rdeep, rpath ) )
+        else:
+            loader = orm.selectinload( rpath[0] )
+            for attribute in rpath[1:]:
+                loader = loader.selectinload( attribute )
+            options.append( loader )
+    return options
+
+def export_entities( query, deep = {}, exclude = [], deep_primary_key = False, yield_per = 1000 ):
+    """Generate a JSON-style nested dict/list structure for each object in a
+    query, like :func:`entity_to_dict`.
+
+    The relationships in the `deep` specification are loaded with a query per
+    relationship for each chunk of `yield_per` objects, instead of a query per
+    object.  Since the objects of a chunk are no longer referenced once their
+    data has been generated, the memory used does not depend on the number of
+    objects in the query.
+
+    :param query: a query on a mapped class
+    :return: an iterator over dicts
+    """
+    mapper = orm.class_mapper( query.column_descriptions[0]['entity'] )
+    query = query.options( *_deep_loader_options( mapper, deep ) ).yield_per( yield_per )
+    for entity in query:
+        yield entity_to_dict( entity, deep, exclude, deep_primary_key )
+
+def _json_default( obj ):
+    if isinstance( obj, ( datetime.date, datetime.datetime, datetime.time ) ):
+        return obj.isoformat()
+    if isinstance( obj, decimal.Decimal ):
+        return str( obj )
+    if isinstance( obj, enum.Enum ):
+        return obj.value
+    raise TypeError( '{} {} can not be serialized.'.format( type( obj ), obj ) )
+
+def export_entities_to_json( query, stream, deep = {}, exclude = [], deep_primary_key = False, yield_per = 1000 ):
+    """Write the objects in a query as newline delimited JSON to a text
+    stream, using :func:`export_entities`.  Dates and times are written in
+    ISO format, decimals as strings.
+
+    :return: the number of objects written
+    """
+    count = 0
+    for data in export_entities( query, deep, exclude, deep_primary_key, yield_per ):
+        stream.write( json.dumps( data, default = _json_default ) )
+        stream.write( '\n' )
+        count += 1
+    return count
+
 @functools.total_ordering
 class EntityBase( object ):
     """A declarative base class that adds some methods that used to be
@@ -333,6 +536,10 @@ class EntityBase( object ):
     def update_or_create( cls, data, session, surrogate = True ):
         return update_or_create_entity( cls, data, session, surrogate )
 
+    @classmethod
+    def update_or_create_many( cls, rows, session, surrogate = True, chunk_size = 500, flush_every = None ):
+        return update_or_create_many( cls, rows, session, surrogate, chunk_size, flush_every )
+
     def from_dict( self, data ):
         """
         Update a mapped class with data from a JSON-style nested dict/list
@@ -0,0 +1,236 @@
+#  ============================================================================
+#
+#  Copyright (C) 2007-2016 Conceptive Engineering bvba.
+#  www.conceptive.be / info@conceptive.be
+#
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+#      * Redistributions of source code must retain the above copyright
+#        notice, this list of conditions and the following disclaimer.
+#      * Redistributions in binary form must reproduce the above copyright
+#        notice, this list of conditions and the following disclaimer in the
+#        documentation and/or other materials provided with the distribution.
+#      * Neither the name of Conceptive Engineering nor the
+#        names of its contributors may be used to endorse or promote products
+#        derived from this software without specific prior written permission.
+#
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+#  ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+#  WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+#  DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+#  (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+#  LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+#  ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#  (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+#  SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+#  ============================================================================
+"""
+Keep the identity map of the long lived application session small.
+
+The identity map of a session only keeps weak references to unmodified
+instances, so instances that are no longer used anywhere are removed from it
+by the garbage collection.  Instances that are still referenced elsewhere,
+for example by a forgotten cache, stay in the identity map however.
+
+:class:`SessionHygiene` expunges the unmodified instances that cannot be
+reached from the objects in use by the application.  Those are given by
+providers, registered by the parts of the application that hold on to
+objects.  The objects bound in the leases, the model contexts and the object
+naming context are registered here.  While actions are running, the objects
+in use by them are unknown, and nothing is pruned.
+"""
+
+import collections
+import dataclasses
+import logging
+import time
+import typing
+
+from sqlalchemy import inspect
+
+LOGGER = logging.getLogger('camelot.core.orm.hygiene')
+
+@dataclasses.dataclass
+class IdentityMapReport( object ):
+    """
+    The size of an identity map before and after pruning, and the number
+    of instances pruned for each class.
+    """
+
+    size_before: int
+    size_after: int
+    pruned: typing.Dict[str, int] = dataclasses.field( default_factory = dict )
+
+    def __str__( self ):
+        pruned = ', '.join( '{} {}'.format( count, name ) for name, count in sorted( self.pruned.items() ) )
+        return 'identity map size {0.size_before} -> {0.size_after}, pruned : {1}'.format( self, pruned or 'nothing' )
+
+class SessionHygiene( object ):
+    """
+    :param interval: the minimum number of seconds between two prunes of
+        :meth:`prune_if_due`
+    """
+
+    def __init__( self, interval = 600.0 ):
+        self.interval = interval
+        self.last_report = None
+        self._last_prune = time.monotonic()
+        self._providers = []
+
+    def register( self, provider ):
+        """
+        Register a function that returns the objects in use by a part of the
+        application.  When the function returns `None`, the objects in use are
+        unknown, and nothing will be pruned.
+        """
+        self._providers.append( provider )
+
+    def _reachable( self, roots ):
+        """
+        :return: a dict with the ids of and the mapped objects that are
+            reachable from the roots through loaded relationships, the roots
+            themselves can be mapped objects or collections of them
+        """
+        reachable = dict()
+        to_visit = collections.deque( roots )
+        while len( to_visit ):
+            obj = to_visit.pop()
+            if isinstance( obj, ( list, tuple, set, frozenset ) ):
+                to_visit.extend( obj )
+                continue
+            if id( obj ) in reachable:
+                continue
+            state = inspect( obj, raiseerr = False )
+            if state is None or not hasattr( state, 'mapper' ):
+                continue
+            reachable[id( obj )] = obj
+            for prop in state.mapper.relationships:
+                value = state.dict.get( prop.key )
+                if value is None:
+                    continue
+                if prop.uselist:
+                    to_visit.extend( value )
+                else:
+                    to_visit.append( value )
+        return reachable
+
+    def prune( self, session ):
+        """Expunge the unmodified instances from the session that cannot be
+        reached from the objects in use.
+
+        :return: an :class:`IdentityMapReport`, or `None` if the objects in
+            use are unknown.
+        """
+        roots = []
+        for provider in self._providers:
+            objects = provider()
+            if objects is None:
+                LOGGER.debug( 'objects in use by {} are unknown, not pruning'.format( provider ) )
+                return None
+            roots.extend( objects )
+        reachable = self._reachable( roots )
+        to_be_deleted = set( id( obj ) for obj in session.deleted )
+        size_before = len( session.identity_map )
+        pruned = collections.Counter()
+        for state in list( session.identity_map.all_states() ):
+            obj = state.obj()
+            # instances might have been expunged by a cascade already
+            if obj is None or obj not in session or not self._prunable( state, reachable, to_be_deleted ):
+                continue
+            # expunging cascades, so keep the instance if the instances to
+            # which it cascades cannot be pruned
+            cascaded = state.mapper.cascade_iterator( 'expunge', state )
+            if not all( self._prunable( related_state, reachable, to_be_deleted ) for _obj, _mapper, related_state, _dict in cascaded ):
+                continue
+            session.expunge( obj )
+            pruned[type( obj ).__name__] += 1
+        report = IdentityMapReport( size_before, len( session.identity_map ), dict( pruned ) )
+        LOGGER.info( str( report ) )
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def _prunable( state, reachable, to_be_deleted ):
+        obj = state.obj()
+        return not ( state.modified or id( obj ) in reachable or id( obj ) in to_be_deleted )
+
+    def prune_if_due( self, session ):
+        """Prune the session if the interval has passed since the last time
+        it was pruned.
+
+        :return: an :class:`IdentityMapReport` if the session was pruned
+        """
+        if time.monotonic() - self._last_prune < self.interval:
+            return None
+        self._last_prune = time.monotonic()
+        return self.prune( session )
+
+session_hygiene = SessionHygiene()
+
+def _bound_objects( context_name ):
+    """
+    :return: the objects bound in a context of the initial naming context
+    """
+    from ..naming import NameNotFoundException, initial_naming_context
+    try:
+        context = initial_naming_context.resolve_context( context_name )
+    except NameNotFoundException:
+        return []
+    objects = []
+    for name in list( context.list() ):
+        try:
+            objects.append( context.resolve( name ) )
+        except NameNotFoundException:
+            # weak bindings might have been removed since they were listed
+            continue
+    return objects
+
+def leased_objects():
+    """
+    The objects in the leases, those are in use as long as the client did
+    not unbind them.
+    """
+    return _bound_objects( 'leases' )
+
+def model_context_objects():
+    """
+    The objects in use by the bound model contexts, or `None` if the objects
+    of a proxy are unknown.
+    """
+    objects = []
+    for model_context in _bound_objects( 'model_context' ):
+        proxy = getattr( model_context, 'proxy', None )
+        if proxy is not None:
+            referenced_objects = proxy.referenced_objects()
+            if referenced_objects is None:
+                return None
+            objects.extend( referenced_objects )
+        edit_cache = getattr( model_context, 'edit_cache', None )
+        if edit_cache is not None:
+            objects.extend( edit_cache.rows_by_entity.keys() )
+        obj = getattr( model_context, 'obj', None )
+        if obj is not None:
+            objects.append( obj )
+    return objects
+
+def model_run_objects():
+    """
+    The objects in use by the running actions are held by their generators,
+    and are unknown, so `None` is returned while actions are running.
+    """
+    if len( _bound_objects( 'model_run' ) ):
+        return None
+    return []
+
+def named_objects():
+    """
+    The objects bound in the object naming context.
+    """
+    return _bound_objects( 'object' )
+
+session_hygiene.register( leased_objects )
+session_hygiene.register( model_context_objects )
+session_hygiene.register( model_run_objects )
+session_hygiene.register( named_objects )
@@ -41,7 +41,7 @@ from .item_view import (
     Sort, OpenTableView, UpdateTableView, ClearSelection, SetSelection,
     RefreshItemView, OpenQmlTableView, ToFirstRow, ToLastRow
 )
-from .open_file import (OpenFile, ClientDirectoryInfo)
+from .open_file import (OpenFile, OpenFileChunk, ClientDirectoryInfo)
 from .orm import (
     CreateUpdateDelete, CreateObjects, DeleteObjects, FlushSession,
     UpdateObjects
@@ -78,6 +78,7 @@ __all__ = [
     MessageBox.__name__,
     NavigationPanel.__name__,
     OpenFile.__name__,
+    OpenFileChunk.__name__,
     OpenFormView.__name__,
     HighlightForm.__name__,
     OpenTableView.__name__,
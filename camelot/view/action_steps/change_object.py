@@ -26,9 +26,10 @@
 #  SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 #
 #  ============================================================================
+import itertools
 import typing
 from dataclasses import dataclass, field
-from typing import List, Union
+from typing import List, Optional, Union
 
 from camelot.admin.icon import Icon
 from camelot.core.naming import initial_naming_context
@@ -89,6 +90,10 @@ class ChangeObjects(UpdateTableView):
         them.  If objects are not validated before showing them, only the
         visible objects will be validated.  But validation of all  objects might
         take a lot of time.
+    :param validation_chunk_size: if set, only this number of objects is
+        validated before showing them.  The view validates the remaining
+        objects in chunks of this size after the dialog has been shown, and
+        stops doing so when the dialog is closed.
 
     .. image:: /_static/listactions/import_from_file_preview.png
 
@@ -115,8 +120,10 @@ class ChangeObjects(UpdateTableView):
 
     validate: bool = True
     qml: bool = False
+    validation_chunk_size: Optional[int] = None
 
     invalid_rows: List = field(init=False, default_factory=list)
+    validated_rows: int = field(init=False, default=0)
     admin_route: AdminRoute = field(init=False)
     window_title: str = field(init=False)
     title: Union[str, ugettext_lazy] = field(init=False, default_factory=lambda: _('Data Preview'))
@@ -130,10 +137,14 @@ class ChangeObjects(UpdateTableView):
         self.qml = True
         if self.validate:
             validator = admin.get_validator()
-            for row, obj in enumerate(value):
+            objects = value
+            if self.validation_chunk_size is not None:
+                objects = itertools.islice(value, self.validation_chunk_size)
+            for row, obj in enumerate(objects):
                 for _message in validator.validate_object(obj):
                     self.invalid_rows.append(row)
                     break
+                self.validated_rows = row + 1
 
     @staticmethod
     def _add_actions(admin, actions):
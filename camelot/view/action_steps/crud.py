@@ -71,13 +71,15 @@ class SetColumns(ActionStep, DataclassSerializable):
     def get_delegate_state(self, static_field_attributes):
         fa = static_field_attributes
         attrs = {}
-        if issubclass(fa['delegate'], (delegates.EnumDelegate,)):
-            attrs = filter_attributes(fa, ['action_routes'])
-            attrs['choices'] = delegates.ComboBoxDelegate.get_choices_data(
-                fa['types'].get_choices()
-            )
-        elif issubclass(fa['delegate'], (delegates.ComboBoxDelegate,)):
+        if issubclass(fa['delegate'], (delegates.ComboBoxDelegate,)):
             attrs = filter_attributes(fa, ['action_routes'])
+            # static choices are shipped once per column, the cells only
+            # contain the choices that are not part of the column
+            choices = fa.get('choices')
+            if (choices is None) and issubclass(fa['delegate'], delegates.EnumDelegate):
+                choices = fa['types'].get_choices()
+            if choices is not None:
+                attrs['choices'] = delegates.ComboBoxDelegate.get_choices_data(choices)
         elif issubclass(fa['delegate'], (delegates.Many2OneDelegate, delegates.FileDelegate)):
             attrs = filter_attributes(fa, ['action_routes'])
         elif issubclass(fa['delegate'], delegates.DateDelegate):
@@ -28,6 +28,9 @@
 #  ============================================================================
 import base64
 from dataclasses import dataclass
+import hashlib
+import itertools
+import mmap
 import os
 
 from dataclasses import field, InitVar
@@ -47,22 +50,39 @@ class OpenFile( ActionStep, DataclassSerializable ):
     
     The :keyword:`yield` statement will return :const:`True` if the file was
     opened successfully.
+
+    With the "stream" type, the content of the file is not part of this
+    action step, but should be send afterwards as a sequence of
+    :class:`OpenFileChunk` action steps, to limit the memory used
+    to the size of a chunk ::
+
+        open_file = OpenFile(path, type="stream")
+        yield open_file
+        yield from open_file.get_chunks()
     """
     # TODO FIXME: Documentation needs to be updated
 
+    _transfer_counter = itertools.count()
+
     path: InitVar[str]
-    type: str = "url"   # "url", "content" or "websocket"
+    type: str = "url"   # "url", "content", "stream" or "websocket"
 
     url: str = field(init=False, default=None)
     content: str = field(init=False, default=None)
     filename: str = field(init=False, default=None)
+    size: int = field(init=False, default=None)
+    transfer: str = field(init=False, default=None)
 
     blocking: bool = False
 
+    # number of bytes in a chunk, a multiple of 3 to have no padding
+    # in the encoded chunks
+    chunk_size = 3 * 256 * 1024
+
     def __post_init__(self, path):
         self._path = path
-        if self.type not in ("content", "url", "websocket"):
-                    raise ValueError(f"Invalid type: {self.type}. Must be 'content', 'url' or 'websocket'.")
+        if self.type not in ("content", "url", "stream", "websocket"):
+                    raise ValueError(f"Invalid type: {self.type}. Must be 'content', 'url', 'stream' or 'websocket'.")
         self.filename = os.path.basename(path)
         if self.type == "url":
             # Assume path is already a valid URL or file path to be used as a URL
@@ -73,9 +93,42 @@ class OpenFile( ActionStep, DataclassSerializable ):
             with open(path, "rb") as f:
                 raw_data = f.read()
                 self.content = base64.b64encode(raw_data).decode("utf-8")
+        elif self.type == "stream":
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"File not found: {path}")
+            self.size = os.path.getsize(path)
+            self.transfer = str(next(self._transfer_counter))
         elif self.type == "websocket":
             self.url = path
 
+    def get_chunks(self):
+        """
+        Generate the action steps that send the content of the file in
+        chunks, when the type is "stream".  The file is read through a
+        memory map, and the checksum of the content is send with the last
+        chunk.
+        """
+        assert self.type == "stream"
+        checksum = hashlib.sha256()
+        with open(self._path, "rb") as f:
+            # an empty file cannot be mapped
+            if self.size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    for offset in range(0, self.size, self.chunk_size):
+                        data = mapped_file[offset:offset+self.chunk_size]
+                        checksum.update(data)
+                        last = (offset + self.chunk_size >= self.size)
+                        yield OpenFileChunk(
+                            transfer=self.transfer,
+                            offset=offset,
+                            content=base64.b64encode(data).decode("utf-8"),
+                            checksum=checksum.hexdigest() if last else None,
+                        )
+                return
+        yield OpenFileChunk(
+            transfer=self.transfer, offset=0, content="", checksum=checksum.hexdigest()
+        )
+
     def __str__( self ):
         return u'Open file {}'.format( self._path )
     
@@ -101,6 +154,27 @@ class OpenFile( ActionStep, DataclassSerializable ):
         os.close( file_descriptor )
         return file_name
 
+@dataclass
+class OpenFileChunk(ActionStep, DataclassSerializable):
+    """
+    A chunk of the content of a file opened with the "stream" type of
+    :class:`OpenFile`.  The file should be opened once the chunk with
+    a checksum has been received.
+
+    :param transfer: the transfer of the :class:`OpenFile` action step
+    :param offset: the position of the chunk in the file
+    :param content: the base64 encoded content of the chunk
+    :param checksum: the hex encoded sha256 checksum of the whole file,
+        only for the last chunk.
+    """
+
+    transfer: str
+    offset: int
+    content: str
+    checksum: str = None
+
+    blocking: bool = False
+
 @dataclass
 class DirectoryInfo(Serializable):
     exists: bool
@@ -94,37 +94,33 @@ class FlushSession(CreateUpdateDelete):
         on an object that has been modified need not to be updated in the GUI.
         This will make the flushing faster, but the GUI might become
         inconsistent.
+    :param objects_updated: objects that have changed and should be updated
+        in the GUI, on top of those that are modified in the session.
+    :param objects_created: objects that were created and should be added
+        to the GUI.
     """
 
-    def __init__(self, session, update_depending_objects = True):
+    def __init__(self, session, update_depending_objects = True, objects_updated = tuple(), objects_created = tuple()):
         #
         # @todo : deleting of objects should be moved from the collection_proxy
         #         to here, once deleting rows is reimplemented as an action
         #
         # @todo : handle the creation of new objects
         #
-        # list of objects that need to receive an update signal
-        dirty_objects = set(session.dirty)
-        
-        #for dirty_object in session.dirty:
-        #    obj_admin = admin.get_related_admin( type( dirty_object ) )
-        #    if obj_admin:
-        #        dirty_objects.update( obj_admin.get_depending_objects( dirty_object ) )
-        objects_deleted = tuple(session.deleted)
+        # the identity map of the session keeps track of the modified
+        # instances as their attributes are set, so dirty and deleted only
+        # iterate over the changes, not over the whole identity map.
         #
-        # Only now is the full list of dirty objects available, so the deleted
-        # can be removed from them
+        # dirty excludes the objects that are marked for deletion
         #
-        for obj_to_delete in session.deleted:
-            try:
-                dirty_objects.remove(obj_to_delete)
-            except KeyError:
-                pass
+        objects_deleted = tuple(session.deleted)
+        objects_updated = tuple(session.dirty.union(objects_updated).difference(objects_deleted))
         
         session.flush()
         super(FlushSession, self).__init__(
             objects_deleted=objects_deleted,
-            objects_updated=tuple(dirty_objects),
+            objects_updated=objects_updated,
+            objects_created=tuple(objects_created),
         )
 
 
@@ -29,7 +29,9 @@
 
 
 from dataclasses import dataclass, field
+from typing import ClassVar
 
+from camelot.core.item_model.proxy import merge_ranges
 from camelot.core.naming import initial_naming_context, NameNotFoundException
 
 from .item_view import OpenTableView
@@ -51,6 +53,9 @@ class SelectObjects(OpenTableView):
 
     blocking: bool = True
 
+    # number of selected objects fetched from the proxy at once
+    yield_per: ClassVar[int] = 1000
+
     def __post_init__(self, value, admin, proxy, search_text):
         super().__post_init__(value, admin, proxy, search_text)
         self.single = False
@@ -72,6 +77,11 @@ class SelectObjects(OpenTableView):
 
     @classmethod
     def deserialize_result(cls, model_context, response):
+        """
+        :return: the selected objects, ordered by their row in the proxy and
+            without duplicates, as the selected ranges are merged before the
+            objects are fetched.
+        """
         # the model context that started the action is no the same
         # as the one in which the selection was made
         objects = []
@@ -82,11 +92,10 @@ class SelectObjects(OpenTableView):
         proxy = model_context.proxy
         if proxy is not None:
             selected_rows = response['selected_rows']
-            for i in range(len(selected_rows) // 2):
-                first_row = selected_rows[2 * i]
-                last_row = selected_rows[2 * i + 1]
-                for obj in proxy[first_row:last_row + 1]:
-                    objects.append(obj)
+            ranges = merge_ranges(
+                (selected_rows[2 * i], selected_rows[2 * i + 1]) for i in range(len(selected_rows) // 2)
+            )
+            objects.extend(proxy.get_ranges(ranges, cls.yield_per))
         return objects
 
 @dataclass
@@ -26,6 +26,7 @@
 #  SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 #
 #  ============================================================================
+import collections
 import logging
 from dataclasses import dataclass, field
 from typing import List, Optional
@@ -34,7 +35,7 @@ logger = logging.getLogger('camelot.view.controls.delegates.comboboxdelegate')
 
 from .customdelegate import CustomDelegate, DocumentationMetaclass
 
-from ....core.item_model import PreviewRole, ChoicesRole
+from ....core.item_model import PreviewRole, ChoicesRole, ColumnAttributesRole
 from ....core.naming import initial_naming_context
 from ....core.qt import Qt
 from ....admin.icon import CompletionValue
@@ -46,6 +47,15 @@ from ...art import ColorScheme
 none_name = list(initial_naming_context._bind_object(None))
 none_item = CompletionValue(none_name, verbose_name=' ')._to_dict()
 
+# choices data, indexed by the content of the choices, to make sure the
+# serialization of a list of choices only happens once for each distinct list.
+_choices_data_cache = collections.OrderedDict()
+_choices_data_cache_size = 256
+# choices data of static choices, indexed by the identity of the list of
+# choices in the static field attributes of a column, the list itself is
+# kept as well, to make sure its id is not reused.
+_static_choices_data_cache = collections.OrderedDict()
+
 @dataclass
 class ComboBoxDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
 
@@ -70,47 +80,117 @@ class ComboBoxDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
         return str(value)
 
     @classmethod
-    def get_choices_data(cls, choices) -> List[CompletionValue]:
+    def _get_cached_choices_data(cls, choices):
+        """
+        :return: a tuple with the list of choices data and a set with the
+            names of the values in the choices.  Both should not be modified,
+            as they are shared between all lists of choices with the same
+            content.
+        """
+        choices = [(initial_naming_context._bind_object(obj), verbose_name) for obj, verbose_name in choices]
+        key = tuple((name, str(verbose_name)) for name, verbose_name in choices)
+        try:
+            cached = _choices_data_cache[key]
+            _choices_data_cache.move_to_end(key)
+            return cached
+        except KeyError:
+            pass
         none_available = False
         choicesData = []
-        for obj, verbose_name in choices:
-            if obj is None:
+        for name, verbose_name in choices:
+            if name == ('constant', 'null'):
                 none_available = True
             choicesData.append(CompletionValue(
-                value=initial_naming_context._bind_object(obj),
+                value=name,
                 verbose_name=verbose_name
                 )._to_dict())
         if not none_available:
             choicesData.append(none_item)
-        return choicesData
+        cached = (choicesData, set(tuple(completion['value']) for completion in choicesData))
+        _choices_data_cache[key] = cached
+        if len(_choices_data_cache) > _choices_data_cache_size:
+            _choices_data_cache.popitem(last=False)
+        return cached
+
+    @classmethod
+    def _get_static_choices_data(cls, choices):
+        """
+        Like :meth:`_get_cached_choices_data`, but for the static choices of a
+        column, which are the same object for all cells in the column, so the
+        choices only need to be bound once per column instead of once per cell.
+        """
+        key = id(choices)
+        cached = _static_choices_data_cache.get(key)
+        if (cached is not None) and (cached[0] is choices):
+            _static_choices_data_cache.move_to_end(key)
+            return cached[1]
+        choices_data = cls._get_cached_choices_data(choices)
+        _static_choices_data_cache[key] = (choices, choices_data)
+        if len(_static_choices_data_cache) > _choices_data_cache_size:
+            _static_choices_data_cache.popitem(last=False)
+        return choices_data
+
+    @classmethod
+    def get_choices_data(cls, choices) -> List[CompletionValue]:
+        choicesData, _names = cls._get_cached_choices_data(choices)
+        return list(choicesData)
 
     @classmethod
     def get_standard_item(cls, locale, model_context):
         item = super().get_standard_item(locale, model_context)
-        value_name = list(initial_naming_context._bind_object(model_context.value))
+        value_name = initial_naming_context._bind_object(model_context.value)
         # eventually, all values should be names, so this should happen in the
         # custom delegate class
-        item.roles[Qt.ItemDataRole.EditRole] = value_name
+        item.roles[Qt.ItemDataRole.EditRole] = list(value_name)
         cls.set_item_editability(model_context, item, True)
         item.roles[PreviewRole] = cls.value_to_string(model_context.value, locale, model_context.field_attributes)
-        choices = model_context.field_attributes.get('choices')
+        static_choices = model_context.static_field_attributes.get('choices')
+        if static_choices is not None:
+            choices = static_choices
+            choicesData, names = cls._get_static_choices_data(static_choices)
+        else:
+            choices = model_context.field_attributes.get('choices')
+            if choices is not None:
+                choicesData, names = cls._get_cached_choices_data(choices)
         if choices is not None:
-            choicesData = cls.get_choices_data(choices)
-            if value_name not in (completion['value'] for completion in choicesData):
-                choicesData = choicesData + [CompletionValue(
-                    value=initial_naming_context._bind_object(model_context.value),
+            extra_choices = []
+            if tuple(value_name) not in names:
+                extra_choices.append(CompletionValue(
+                    value=value_name,
                     verbose_name=str(model_context.value),
                     background = ColorScheme.VALIDATION_ERROR.name(),
                     virtual = True
-                    )._to_dict()]
-            item.roles[ChoicesRole] = choicesData
+                    )._to_dict())
+            # static choices are part of the column attributes, so only the
+            # choices that are not in the column should be in the item
+            if static_choices is not None:
+                item.roles[ChoicesRole] = extra_choices or None
+            else:
+                item.roles[ChoicesRole] = choicesData + extra_choices
         return item
 
+    def get_choices(self, index):
+        """
+        :return: the choices for the editor of an index, combining the choices
+            of the column with those of the item.
+        """
+        choices = index.data(ChoicesRole)
+        if (choices is None) or all(choice.get('virtual') for choice in choices):
+            column_attributes = index.model().headerData(
+                index.column(), Qt.Orientation.Horizontal, ColumnAttributesRole
+            )
+            if column_attributes is not None:
+                _delegate_cls_name, column_attributes = tuple(column_attributes)
+                column_choices = column_attributes.get('choices')
+                if column_choices is not None:
+                    return list(column_choices) + list(choices or [])
+        return choices
+
     def setEditorData(self, editor, index):
         if index.model() is None:
             return
         self.set_default_editor_data(editor, index)
-        choices = index.data(ChoicesRole)
+        choices = self.get_choices(index)
         value = index.data(Qt.ItemDataRole.EditRole)
         editor.set_choices(choices)
         editor.set_value(value)
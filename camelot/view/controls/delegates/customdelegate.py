@@ -28,11 +28,14 @@
 #  ============================================================================
 
 
+import collections
 import json
 import logging
 import dataclasses
+import sys
 
 from camelot.core.naming import initial_naming_context
+from camelot.core.utils import ugettext_lazy
 
 from ....core.qt import QtGui, QtCore, QtWidgets, Qt
 from ....core.serializable import json_encoder, NamedDataclassSerializable
@@ -44,12 +47,51 @@ from ....core.backend import get_root_backend
 from ..action_widget import AbstractActionWidget
 from camelot.view.crud_action import DataCell
 from dataclasses import dataclass, InitVar
-from typing import Any, ClassVar, Optional
+from typing import Any, ClassVar, Dict, Optional, Tuple
 
 
 
 LOGGER = logging.getLogger(__name__)
 
+# serialized action routes and states, indexed by their content, as those
+# tend to be the same for all items in a column
+_encoded_routes_cache = collections.OrderedDict()
+_encoded_states_cache = collections.OrderedDict()
+_encoded_cache_size = 256
+
+def _fingerprint(obj):
+    """
+    :return: a hashable representation of the content of an action state
+    :raises: `TypeError` if the content cannot be represented
+    """
+    if dataclasses.is_dataclass(obj):
+        return (type(obj), tuple(_fingerprint(getattr(obj, f.name)) for f in dataclasses.fields(obj)))
+    if isinstance(obj, (list, tuple)):
+        return (type(obj), tuple(_fingerprint(value) for value in obj))
+    if isinstance(obj, ugettext_lazy):
+        return (ugettext_lazy, str(obj))
+    hash(obj)
+    # include the type, since equal scalars such as 1, 1.0 and True are
+    # encoded differently
+    return (type(obj), obj)
+
+def _cached_encode(cache, key, encode):
+    """
+    Encode an object and store the result in an LRU cache, if no result for
+    the key is in the cache yet.
+    """
+    try:
+        encoded = cache[key]
+        cache.move_to_end(key)
+        return encoded
+    except KeyError:
+        pass
+    encoded = encode()
+    cache[key] = encoded
+    if len(cache) > _encoded_cache_size:
+        cache.popitem(last=False)
+    return encoded
+
 def DocumentationMetaclass(name, bases, dct):
     dct['__doc__'] = (dct.get('__doc__') or '') + """
 
@@ -137,6 +179,8 @@ class CustomDelegate(NamedDataclassSerializable, QtWidgets.QItemDelegate, metacl
     _parent: InitVar[QtCore.QObject] = None
 
     horizontal_align: ClassVar[Any] = Qt.AlignmentFlag.AlignLeft
+    # the field attributes used to construct the column roles
+    column_role_attributes: ClassVar[Tuple[str, ...]] = tuple()
 
     def __post_init__(self, parent):
         """:param parent: the parent object for the delegate
@@ -172,6 +216,60 @@ class CustomDelegate(NamedDataclassSerializable, QtWidgets.QItemDelegate, metacl
         else:
             item.flags = item.flags & ~Qt.ItemFlag.ItemIsEditable
 
+    @classmethod
+    def get_column_roles(cls, field_attributes) -> Dict[int, Any]:
+        """
+        The roles that depend only on the field attributes listed in
+        :attr:`column_role_attributes`, and not on the value of a field.  When
+        those attributes are static, these roles are computed once for all the
+        items of a column that are created at the same time.
+
+        :param field_attributes: the field attributes of the column
+        :return: a `dict` with the data for each role
+        """
+        return {}
+
+    @classmethod
+    def prefetch_data(cls, objects, field_attributes):
+        """
+        Called once for each column before the items of a set of objects are
+        created with :meth:`get_standard_item`, to allow a delegate to load the
+        data it needs for all those objects at once.
+
+        :param objects: a list with the objects for which items will be created
+        :param field_attributes: the static field attributes of the column
+        :return: a `dict` with data to be reused while the items of those
+            objects are created, available as the `prefetched_data` of the
+            model context passed to :meth:`get_standard_item`
+        """
+        return {}
+
+    @classmethod
+    def encode_action_routes(cls, routes) -> str:
+        """
+        :return: the serialized action routes, the same string object is
+            returned for equal routes.
+        """
+        encode = lambda:sys.intern(json_encoder.encode(routes))
+        try:
+            key = _fingerprint(routes)
+        except TypeError:
+            return encode()
+        return _cached_encode(_encoded_routes_cache, key, encode)
+
+    @classmethod
+    def encode_action_states(cls, states) -> str:
+        """
+        :return: the serialized action states, states with the same content
+            are serialized only once.
+        """
+        encode = lambda:json_encoder.encode([dataclasses.asdict(state) for state in states])
+        try:
+            key = _fingerprint(states)
+        except TypeError:
+            return encode()
+        return _cached_encode(_encoded_states_cache, key, encode)
+
     @classmethod
     def get_standard_item(cls, locale, model_context):
         """
@@ -184,10 +282,7 @@ class CustomDelegate(NamedDataclassSerializable, QtWidgets.QItemDelegate, metacl
         :return: a `QStandardItem` object
         """
         routes = model_context.field_attributes.get('action_routes', [])
-        states = []
-        for action in model_context.field_attributes.get('actions', []):
-            state = action.get_state(model_context)
-            states.append(dataclasses.asdict(state))
+        states = [action.get_state(model_context) for action in model_context.field_attributes.get('actions', [])]
         #assert len(routes) == len(states), 'len(routes) != len(states)\nroutes: {}\nstates: {}'.format(routes, states)
         if len(routes) != len(states):
             LOGGER.error('CustomDelegate: len(routes) != len(states)\nroutes: {}\nstates: {}'.format(routes, states))
@@ -195,8 +290,8 @@ class CustomDelegate(NamedDataclassSerializable, QtWidgets.QItemDelegate, metacl
         # eventually, the whole item will need to be serialized, while this
         # is not yet the case, serialize some roles to make the usable outside
         # python.
-        serialized_action_routes = json_encoder.encode(routes)
-        serialized_action_states = json_encoder.encode(states)
+        serialized_action_routes = cls.encode_action_routes(routes)
+        serialized_action_states = cls.encode_action_states(states)
         item = DataCell()
         # @todo : the line below should be removed, but only after testing
         #         if each delegate properly handles setting edit role
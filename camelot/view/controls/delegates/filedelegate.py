@@ -27,6 +27,7 @@
 #
 #  ============================================================================
 
+import collections
 from dataclasses import dataclass, field
 from typing import List, Optional
 
@@ -53,6 +54,20 @@ class FileDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
             return value.verbose_name
         return str()
 
+    @classmethod
+    def prefetch_data(cls, objects, field_attributes):
+        # give the storage the opportunity to fetch the files of the rows
+        # that are about to become visible
+        field_name = field_attributes['field_name']
+        stored_files = collections.defaultdict(list)
+        for obj in objects:
+            stored_file = getattr(obj, field_name, None)
+            if stored_file is not None:
+                stored_files[stored_file.storage].append(stored_file)
+        for storage, storage_files in stored_files.items():
+            storage.prefetch(storage_files)
+        return {}
+
     @classmethod
     def get_standard_item(cls, locale, model_context):
         item = super().get_standard_item(locale, model_context)
@@ -28,7 +28,7 @@
 #  ============================================================================
 
 from dataclasses import dataclass, field
-from typing import Any, ClassVar, List, Optional
+from typing import Any, ClassVar, List, Optional, Tuple
 from decimal import Decimal
 
 from ....admin.admin_route import Route
@@ -51,6 +51,10 @@ class FloatDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
     action_routes: List[Route] = field(default_factory=list)
 
     horizontal_align: ClassVar[Any] = Qt.AlignmentFlag.AlignRight
+    column_role_attributes: ClassVar[Tuple[str, ...]] = (
+        'focus_policy', 'suffix', 'prefix', 'single_step', 'precision',
+        'minimum', 'maximum',
+    )
 
     @classmethod
     def get_editor_class(cls):
@@ -74,22 +78,26 @@ class FloatDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
             return str()
 
     @classmethod
-    def get_standard_item(cls, locale, model_context):
-        minimum, maximum = model_context.field_attributes.get('minimum'), model_context.field_attributes.get('maximum')
+    def get_column_roles(cls, field_attributes):
+        minimum, maximum = field_attributes.get('minimum'), field_attributes.get('maximum')
         minimum = minimum if minimum is not None else constants.camelot_minfloat
         maximum = maximum if maximum is not None else constants.camelot_maxfloat
+        roles = {}
+        roles[FocusPolicyRole] = field_attributes.get('focus_policy')
+        roles[SuffixRole] = field_attributes.get('suffix')
+        roles[PrefixRole] = field_attributes.get('prefix')
+        single_step = field_attributes.get('single_step')
+        if single_step is not None:
+            roles[SingleStepRole] = initial_naming_context._bind_object(Decimal(single_step))
+        roles[PrecisionRole] = field_attributes.get('precision', 2)
+        roles[MinimumRole] = initial_naming_context._bind_object(Decimal(minimum))
+        roles[MaximumRole] = initial_naming_context._bind_object(Decimal(maximum))
+        return roles
+
+    @classmethod
+    def get_standard_item(cls, locale, model_context):
         item = super().get_standard_item(locale, model_context)
         cls.set_item_editability(model_context, item, False)
-        item.roles[FocusPolicyRole] = model_context.field_attributes.get('focus_policy')
-        item.roles[SuffixRole] = model_context.field_attributes.get('suffix')
-        item.roles[PrefixRole] = model_context.field_attributes.get('prefix')
-        single_step = model_context.field_attributes.get('single_step')
-        if single_step is not None:
-            item.roles[SingleStepRole] = initial_naming_context._bind_object(Decimal(single_step))
-        precision = model_context.field_attributes.get('precision', 2)
-        item.roles[PrecisionRole] = precision
-        item.roles[MinimumRole] = initial_naming_context._bind_object(Decimal(minimum))
-        item.roles[MaximumRole] = initial_naming_context._bind_object(Decimal(maximum))
         if model_context.value is not None:
             item.roles[Qt.ItemDataRole.EditRole] = initial_naming_context._bind_object(Decimal(model_context.value))
         item.roles[PreviewRole] = cls.value_to_string(model_context.value, locale, model_context.field_attributes)
@@ -31,7 +31,7 @@ from camelot.core import constants
 from camelot.core.naming import initial_naming_context
 
 from dataclasses import dataclass
-from typing import Any, ClassVar, Optional
+from typing import Any, ClassVar, Optional, Tuple
 
 from ....core.qt import Qt
 from ....core.item_model import (
@@ -50,6 +50,9 @@ class IntegerDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
     decimal: bool = False
 
     horizontal_align: ClassVar[Any] = Qt.AlignmentFlag.AlignRight
+    column_role_attributes: ClassVar[Tuple[str, ...]] = (
+        'suffix', 'prefix', 'single_step', 'minimum', 'maximum',
+    )
 
     @classmethod
     def get_editor_class(cls):
@@ -66,17 +69,22 @@ class IntegerDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
             return value_str
 
     @classmethod
-    def get_standard_item(cls, locale, model_context):
-        minimum, maximum = model_context.field_attributes.get('minimum'), model_context.field_attributes.get('maximum')
+    def get_column_roles(cls, field_attributes):
+        minimum, maximum = field_attributes.get('minimum'), field_attributes.get('maximum')
         minimum = minimum if minimum is not None else constants.camelot_minfloat
         maximum = maximum if maximum is not None else constants.camelot_maxfloat
+        roles = {}
+        roles[SuffixRole] = field_attributes.get('suffix')
+        roles[PrefixRole] = field_attributes.get('prefix')
+        roles[SingleStepRole] = field_attributes.get('single_step')
+        roles[MinimumRole] = minimum
+        roles[MaximumRole] = maximum
+        return roles
+
+    @classmethod
+    def get_standard_item(cls, locale, model_context):
         item = super().get_standard_item(locale, model_context)
         cls.set_item_editability(model_context, item, False)
-        item.roles[SuffixRole] = model_context.field_attributes.get('suffix')
-        item.roles[PrefixRole] = model_context.field_attributes.get('prefix')
-        item.roles[SingleStepRole] = model_context.field_attributes.get('single_step')
-        item.roles[MinimumRole] = minimum
-        item.roles[MaximumRole] = maximum
         if model_context.value is not None:
             item.roles[Qt.ItemDataRole.EditRole] = initial_naming_context._bind_object(model_context.value)
             item.roles[PreviewRole] = cls.value_to_string(model_context.value, locale, model_context.field_attributes)
@@ -99,4 +107,3 @@ class IntegerDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
         editor.set_maximum(maximum)
         editor.set_value(value)
         self.update_field_action_states(editor, index)
-
@@ -32,6 +32,7 @@ from typing import List, Optional
 import logging
 
 from ....admin.admin_route import Route
+from ....core.orm import load_many_to_one
 from ....core.naming import initial_naming_context
 from ....core.qt import Qt
 from ....core.item_model import PreviewRole, CompletionsRole
@@ -75,16 +76,32 @@ class Many2OneDelegate(CustomDelegate, metaclass=DocumentationMetaclass):
                 )
             return verbose_name
 
+    @classmethod
+    def prefetch_data(cls, objects, field_attributes):
+        # load all related objects at once and set them on the objects,
+        # instead of a lazy load for each object when its value is stripped
+        load_many_to_one(objects, field_attributes['field_name'])
+        # the verbose names of the related objects, by their id, the objects
+        # are kept as well, so their id is not reused during the request
+        return {}
+
     @classmethod
     def get_standard_item(cls, locale, model_context):
         item = super().get_standard_item(locale, model_context)
         cls.set_item_editability(model_context, item, False)
-        value_name = initial_naming_context._bind_object(model_context.value)
+        value = model_context.value
+        value_name = initial_naming_context._bind_object(value)
         # eventually, all values should be names, so this should happen in the
         # custom delegate class
         item.roles[Qt.ItemDataRole.EditRole] = value_name
-        if model_context.value is not None:
-            item.roles[PreviewRole] = cls.value_to_string(model_context.value, locale, model_context.field_attributes)
+        if value is not None:
+            verbose_names = model_context.prefetched_data
+            try:
+                _value, verbose_name = verbose_names[id(value)]
+            except KeyError:
+                verbose_name = cls.value_to_string(value, locale, model_context.field_attributes)
+                verbose_names[id(value)] = (value, verbose_name)
+            item.roles[PreviewRole] = verbose_name
         return item
 
     def setEditorData(self, editor, index):
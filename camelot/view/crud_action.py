@@ -14,7 +14,7 @@ from ..core.item_model import (
     ObjectRole, PreviewRole,
     ActionRoutesRole, ActionStatesRole, CompletionsRole,
     ActionModeRole, FocusPolicyRole,
-    VisibleRole, NullableRole, IsStatusRole
+    VisibleRole, NullableRole, IsStatusRole, merge_ranges
 )
 from ..core.naming import initial_naming_context, NameNotFoundException
 from ..core.qt import Qt, QtGui
@@ -116,12 +116,50 @@ class UpdateMixin(object):
         field_action_model_context.obj = obj
         return field_action_model_context
 
-    def add_data(self, model_context, row, columns, obj, data):
+    def prefetch_data(self, model_context, columns, objects):
+        """Give the delegates of the columns the opportunity to load the
+        data for all objects at once, before add_data is called for each of
+        them.
+        :param columns: the columns for which data will be added
+        :param objects: the objects from which data will be stripped
+        :return: a `dict` with the prefetched data of each column, to be
+            passed to :meth:`add_data` for the same request
+        """
+        prefetched_data = dict()
+        objects = [obj for obj in objects if obj is not None]
+        if not len(objects):
+            return prefetched_data
+        for column in columns:
+            static_field_attributes = model_context.static_field_attributes[column]
+            try:
+                prefetched_data[column] = static_field_attributes['delegate'].prefetch_data(
+                    objects, static_field_attributes
+                )
+            except Exception as e:
+                logger.error('could not prefetch data of {}'.format(static_field_attributes['field_name']), exc_info=e)
+        return prefetched_data
+
+    def get_column_roles(self, model_context, columns):
+        """Compute the column roles of the delegates once from the static
+        field attributes, to be reused for each row in :meth:`add_data`.
+        :param columns: the columns for which data will be added
+        :return: a `dict` with the column roles of each column
+        """
+        column_roles = dict()
+        for column in columns:
+            static_field_attributes = model_context.static_field_attributes[column]
+            column_roles[column] = static_field_attributes['delegate'].get_column_roles(static_field_attributes)
+        return column_roles
+
+    def add_data(self, model_context, row, columns, obj, data, column_roles=None, prefetched_data=None):
         """Add data from object o at a row in the cache
         :param row: the row in the cache into which to add data
         :param columns: the columns for which data should be added
         :param obj: the object from which to strip the data
         :param data: fill the data cache, otherwise only fills the header cache
+        :param column_roles: the column roles as returned by
+            :meth:`get_column_roles`, if `None` they are computed for each item
+        :param prefetched_data: the data as returned by :meth:`prefetch_data`
         :return: the changes to the item model
         """
         admin = model_context.admin
@@ -165,7 +203,18 @@ class UpdateMixin(object):
                     field_action_model_context = self.field_action_model_context(
                         model_context, obj, field_attributes
                     )
+                    field_action_model_context.static_field_attributes = static_field_attributes[column]
+                    if (prefetched_data is not None) and (prefetched_data.get(column) is not None):
+                        field_action_model_context.prefetched_data = prefetched_data[column]
                     item = delegate.get_standard_item(locale, field_action_model_context)
+                    # the column roles only need to be computed again if they
+                    # depend on the dynamic field attributes
+                    roles = column_roles.get(column) if column_roles is not None else None
+                    dynamic_attributes = dynamic_field_attributes[column]
+                    if (roles is None) or ('delegate' in dynamic_attributes) or \
+                       any(attribute in dynamic_attributes for attribute in delegate.column_role_attributes):
+                        roles = delegate.get_column_roles(field_attributes)
+                    item.roles.update(roles)
                 else:
                     item = DataCell(**asdict(invalid_item))
                 # remove roles with None values
@@ -173,37 +222,45 @@ class UpdateMixin(object):
                 item.row = row
                 item.column = column
                 items.append(item)
-            try:
-                verbose_identifier = admin.get_verbose_identifier(obj)
-            except (Exception, RuntimeError, TypeError, NameError) as e:
-                message = "could not get verbose identifier of object of type %s"%(obj.__class__.__name__)
-                logger.error(message, exc_info=e)
-                verbose_identifier = u''
-            valid = False
-            message = None
-            if is_object_valid:
-                for message in model_context.validator.validate_object(obj):
-                    break
-                else:
-                    valid = True
-            header_item = DataRowHeader()
-            header_item.row = row
-            header_item.object = id(obj)
-            header_item.verbose_identifier = verbose_identifier
-            header_item.valid = valid
-            header_item.message = message
-            if action_state is not None:
-                header_item.tool_tip = action_state.tooltip
-                header_item.display = str(action_state.verbose_name)
-                # The decoration role contains the icon as a QPixmap which is used in the old table view.
-                header_item.decoration = action_state.icon
-                if action_state.icon is not None:
-                    # The whatsThis role contains the icon name which is used in the QML table view.
-                    # (note: user roles can't be used in a QML VerticalHeaderView)
-                    header_item.icon_name = action_state.icon.name
+            header_item = self.get_header_item(model_context, row, obj, is_object_valid, action_state)
             changed_ranges.append((row, header_item, items))
         return changed_ranges
 
+    def get_header_item(self, model_context, row, obj, is_object_valid, action_state):
+        """
+        :return: the header item of a row, with the validity of the object
+        """
+        admin = model_context.admin
+        try:
+            verbose_identifier = admin.get_verbose_identifier(obj)
+        except (Exception, RuntimeError, TypeError, NameError) as e:
+            message = "could not get verbose identifier of object of type %s"%(obj.__class__.__name__)
+            logger.error(message, exc_info=e)
+            verbose_identifier = u''
+        valid = False
+        message = None
+        if is_object_valid:
+            for message in model_context.validator.validate_object(obj):
+                break
+            else:
+                valid = True
+        header_item = DataRowHeader()
+        header_item.row = row
+        header_item.object = id(obj)
+        header_item.verbose_identifier = verbose_identifier
+        header_item.valid = valid
+        header_item.message = message
+        if action_state is not None:
+            header_item.tool_tip = action_state.tooltip
+            header_item.display = str(action_state.verbose_name)
+            # The decoration role contains the icon as a QPixmap which is used in the old table view.
+            header_item.decoration = action_state.icon
+            if action_state.icon is not None:
+                # The whatsThis role contains the icon name which is used in the QML table view.
+                # (note: user roles can't be used in a QML VerticalHeaderView)
+                header_item.icon_name = action_state.icon.name
+        return header_item
+
 
 class ChangeSelection(Action):
 
@@ -385,13 +442,15 @@ class Created(Action, UpdateMixin):
         # the new object has been indexed
         objects = initial_naming_context.resolve(tuple(mode['objects']))
         changed_ranges = []
+        columns = tuple(range(len(model_context.static_field_attributes)))
+        prefetched_data = self.prefetch_data(model_context, columns, objects)
+        column_roles = self.get_column_roles(model_context, columns)
         for obj in objects:
             try:
                 row = model_context.proxy.index(obj)
             except ValueError:
                 continue
-            columns = tuple(range(len(model_context.static_field_attributes)))
-            changed_ranges.extend(self.add_data(model_context, row, columns, obj, True))
+            changed_ranges.extend(self.add_data(model_context, row, columns, obj, True, column_roles, prefetched_data))
         yield action_steps.Created(changed_ranges)
 
     def __repr__(self):
@@ -488,9 +547,12 @@ class RowData(Update):
         columns = mode["columns"]
         offset, limit = self.offset_and_limit_rows_to_get(rows)
         changed_ranges = []
-        for obj in list(model_context.proxy[offset:offset+limit]):
+        objects = list(model_context.proxy[offset:offset+limit])
+        prefetched_data = self.prefetch_data(model_context, columns, objects)
+        column_roles = self.get_column_roles(model_context, columns)
+        for obj in objects:
             row = model_context.proxy.index(obj)
-            changed_ranges.extend(self.add_data(model_context, row, columns, obj, True))
+            changed_ranges.extend(self.add_data(model_context, row, columns, obj, True, column_roles, prefetched_data))
         yield action_steps.Update(changed_ranges)
 
     def __repr__(self):
@@ -499,6 +561,66 @@ class RowData(Update):
 rowdata_name = crud_action_context.bind(RowData.name, RowData(), True)
 
 
+class Validate(Action, UpdateMixin):
+    """
+    Validate a range of rows, to update the header items of rows that have
+    not been visible yet.  The data of the objects is not stripped, and
+    the caches with the data of the visible rows are left untouched.
+
+    Validating all rows of a large view is done by the view in chunks, so it
+    can be interrupted at any time.  The mode contains the `offset` and
+    `limit` of the chunk, and optionally the `visible` rows, as a list with
+    an offset and a limit, those rows are validated and updated first.  Rows
+    beyond the end of the proxy are ignored.
+    """
+
+    name = 'validate'
+
+    def model_run(self, model_context, mode):
+        from camelot.view import action_steps
+        row_count = len(model_context.proxy)
+        offset, limit = mode['offset'], mode['limit']
+        rows = range(min(offset, row_count), min(offset+limit, row_count))
+        visible_rows = range(0)
+        visible = mode.get('visible')
+        if visible is not None:
+            visible_offset, visible_limit = visible
+            visible_rows = range(min(visible_offset, row_count), min(visible_offset+visible_limit, row_count))
+        # send the header items of the visible rows before the others
+        for rows_to_validate in (visible_rows, [row for row in rows if row not in visible_rows]):
+            if len(rows_to_validate):
+                yield action_steps.Update(self.validate_rows(model_context, rows_to_validate))
+
+    def validate_rows(self, model_context, rows):
+        """
+        :return: the changed ranges with the header items of the rows
+        """
+        admin = model_context.admin
+        objects = dict()
+        for first_row, last_row in merge_ranges([(row, row) for row in rows]):
+            for row, obj in enumerate(model_context.proxy[first_row:last_row+1], first_row):
+                objects[row] = obj
+        changed_ranges = []
+        for row in rows:
+            obj = objects.get(row)
+            if obj is None:
+                continue
+            action_state = None
+            is_object_valid = admin.is_readable(obj)
+            if is_object_valid and admin.list_action:
+                model_context.obj = obj
+                model_context.current_row = row
+                action_state = admin.list_action.get_state(model_context)
+            header_item = self.get_header_item(model_context, row, obj, is_object_valid, action_state)
+            changed_ranges.append((row, header_item, []))
+        return changed_ranges
+
+    def __repr__(self):
+        return '{0.__class__.__name__}'.format(self)
+
+validate_name = crud_action_context.bind(Validate.name, Validate(), True)
+
+
 class SetColumns(Action):
 
     name = 'set_columns'
@@ -742,3 +864,4 @@ class CrudActions(DataclassSerializable):
     field_action: Route = field(init=False, default=runfieldaction_name)
     completion: Route = field(init=False, default=completion_name)
     refresh: Route = field(init=False, default=refresh_name)
+    validate: Route = field(init=False, default=validate_name)
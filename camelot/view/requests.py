@@ -1,6 +1,7 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
 import logging
+import time
 import typing
 
 from ..core.exception import CancelRequest, GuiException
@@ -25,11 +26,90 @@ class ModelRun(object):
 
 model_run_names = initial_naming_context.bind_new_context('model_run')
 
+class ProgressThrottle(object):
+    """
+    Coalesce the non blocking :class:`camelot.view.action_steps.UpdateProgress`
+    steps of an action run, so at most one of them is sent to the client in
+    each interval.  The step that is sent carries the latest value and
+    text, and the details of all the steps it replaces.
+
+    The throttle is used on the model thread only.  A step that is kept is
+    sent with the next step that arrives after the interval, or when the
+    throttle is flushed.
+
+    :param interval: the minimum number of seconds between two steps
+    :param send: a function that sends a step to the client
+    """
+
+    def __init__(self, interval, send):
+        self.interval = interval
+        self.send = send
+        self.pending = None
+        self.last_sent = None
+
+    def applies_to(self, step):
+        """
+        :return: `True` if the step can be coalesced with other steps
+        """
+        from .action_steps import UpdateProgress
+        return (type(step) == UpdateProgress) and (not step.blocking) and \
+               (step.exc_info is None) and (step.detail_level <= logging.INFO)
+
+    def throttle(self, step):
+        """
+        Send the step now, or keep it until a step arrives after the interval
+        or the throttle is flushed.
+        """
+        if self.pending is not None:
+            step = self.merge(self.pending, step)
+        self.pending = None
+        now = time.monotonic()
+        if self.last_sent is None or (now - self.last_sent) >= self.interval:
+            self._send(step)
+        else:
+            self.pending = step
+
+    def _send(self, step):
+        self.last_sent = time.monotonic()
+        self.send(step)
+
+    def merge(self, previous, step):
+        """
+        :return: a new step that has the same effect as the previous step
+            followed by the step
+        """
+        detail = step.detail
+        clear_details = step.clear_details or previous.clear_details
+        if (not step.clear_details) and (previous.detail is not None):
+            details = [str(d) for d in (previous.detail, step.detail) if d is not None]
+            detail = '\n'.join(details)
+        return replace(
+            step,
+            detail=detail,
+            clear_details=clear_details,
+            text=step.text if step.text is not None else previous.text,
+            title=step.title if step.title is not None else previous.title,
+            enlarge=step.enlarge if step.enlarge is not None else previous.enlarge,
+        )
+
+    def flush(self):
+        """
+        Send the step that was kept, this should happen before any other step
+        is sent.
+        """
+        step, self.pending = self.pending, None
+        if step is not None:
+            self._send(step)
+
 class AbstractRequest(NamedDataclassSerializable):
     """
     Serialiazable Requests the UI can send to the model
     """
 
+    # minimum number of seconds between two non blocking progress updates
+    # sent to the client
+    progress_interval = 0.05
+
     @classmethod
     def handle_request(cls, request, response_handler, cancel_handler):
         request_type_name, request_data = json.loads(request)
@@ -100,19 +180,30 @@ class AbstractRequest(NamedDataclassSerializable):
             LOGGER.error('Request contains no run {}'.format(request_data))
             return
         gui_run_name = run.gui_run_name
+
+        def send_step(step):
+            response_handler.send_response(ActionStepped(
+                run_name=run_name, gui_run_name=gui_run_name,
+                step=(type(step).__name__, step),
+                blocking=step.blocking,
+            ))
+
+        progress_throttle = ProgressThrottle(cls.progress_interval, send_step)
+        flush_progress = progress_throttle.flush
+
         try:
             result = cls._next(run, request_data)
             while True:
                 if isinstance(result, ActionStep):
                     run.last_step = result
-                    response_handler.send_response(ActionStepped(
-                        run_name=run_name, gui_run_name=gui_run_name,
-                        step=(type(result).__name__, result),
-                        blocking=result.blocking,
-                    ))
-                    if result.blocking:
-                        # this step is blocking, interrupt the loop
-                        return
+                    if progress_throttle.applies_to(result):
+                        progress_throttle.throttle(result)
+                    else:
+                        flush_progress()
+                        send_step(result)
+                        if result.blocking:
+                            # this step is blocking, interrupt the loop
+                            return
                 #
                 # Cancel requests can arrive asynchronously through non 
                 # blocking ActionSteps such as UpdateProgress
@@ -128,11 +219,14 @@ class AbstractRequest(NamedDataclassSerializable):
             # a StopIteration, so there is no need to stop the action now.
             # However not doing so results in the progress popup not being
             # popped in certain cases (eg run forward all schedules -> cancel)
+            flush_progress()
             cls._stop_action(run_name, gui_run_name, response_handler, e)
         except StopIteration as e:
+            flush_progress()
             cls._stop_action(run_name, gui_run_name, response_handler, e)
         except Exception as e:
             LOGGER.error('Unhandled exception', exc_info=e)
+            flush_progress()
             cls._send_stop_message(
                 ('constant', 'null'), gui_run_name, response_handler, e
             )
@@ -267,3 +361,7 @@ class Unbind(AbstractRequest):
                 initial_naming_context.unbind(tuple(lease))
             except NameNotFoundException:
                 LOGGER.warn('received unbind request for non bound lease : {}'.format(lease))
+        # objects are released when leases are unbound, so this is the moment
+        # to prune them from the long lived session
+        from ..core.orm import Session, session_hygiene
+        session_hygiene.prune_if_due(Session())
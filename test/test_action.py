@@ -0,0 +1,177 @@
+import types
+import unittest
+from unittest import mock
+
+from camelot.admin.action.list_action import DuplicateSelection, EditAction
+from camelot.view import action_steps
+
+
+class FakeObject(object):
+
+    def __init__(self, valid=True):
+        self.valid = valid
+
+
+class FakeSession(object):
+
+    def __init__(self):
+        self.dirty = set()
+        self.deleted = set()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+class DuplicateSelectionCase(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(EditAction, 'model_run')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.admin = mock.MagicMock()
+        self.admin.copy_many.side_effect = lambda objects: [FakeObject(obj.valid) for obj in objects]
+        self.admin.get_validator.return_value.validate_object.side_effect = \
+            lambda obj: [] if obj.valid else ['not valid']
+        self.admin.get_depending_objects.return_value = []
+
+    def run_action(self, objects):
+        model_context = types.SimpleNamespace(
+            admin=self.admin, proxy=mock.MagicMock(), session=FakeSession(),
+            get_selection=lambda: iter(objects), selection_count=len(objects),
+        )
+        action = DuplicateSelection()
+        action.chunk_size = 10
+        steps = list(action.model_run(model_context, None))
+        return model_context, steps
+
+    def test_duplicate_selection(self):
+        model_context, steps = self.run_action([FakeObject() for i in range(25)])
+        self.assertEqual(model_context.session.flushes, 3)
+        self.assertFalse([step for step in steps if isinstance(step, action_steps.MessageBox)])
+        self.admin.expunge.assert_not_called()
+
+    def test_skip_invalid_copies(self):
+        objects = [FakeObject(valid=(i != 3 and i != 17)) for i in range(25)]
+        model_context, steps = self.run_action(objects)
+        # all chunks are flushed, also after a chunk with an invalid copy
+        self.assertEqual(model_context.session.flushes, 3)
+        self.assertEqual(self.admin.expunge.call_count, 2)
+        self.assertEqual(model_context.proxy.remove_many.call_count, 2)
+        messages = [step for step in steps if isinstance(step, action_steps.MessageBox)]
+        self.assertEqual(len(messages), 1)
+        self.assertIn('2 of 25', messages[0].text)
+
+    def test_open_invalid_single_copy(self):
+        model_context, steps = self.run_action([FakeObject(valid=False)])
+        self.assertEqual(model_context.session.flushes, 0)
+        self.assertIsInstance(steps[-1], action_steps.OpenFormView)
+
+
+class ValidateCase(unittest.TestCase):
+
+    def test_validate_without_display_caches(self):
+        from camelot.core.cache import ValueCache
+        from camelot.view.crud_action import Validate
+        objects = [FakeObject(valid=(i % 3 != 0)) for i in range(50)]
+        admin = mock.MagicMock()
+        admin.list_action = None
+        admin.get_verbose_identifier.side_effect = lambda obj: str(objects.index(obj))
+        validator = mock.MagicMock()
+        validator.validate_object.side_effect = lambda obj: [] if obj.valid else ['not valid']
+        model_context = types.SimpleNamespace(
+            admin=admin, proxy=objects, validator=validator,
+            edit_cache=ValueCache(100), attributes_cache=ValueCache(100),
+        )
+        model_context.edit_cache.add_data(0, objects[0], {0: 'visible'})
+        mode = {'offset': 10, 'limit': 20, 'visible': [20, 5]}
+        visible_update, update = list(Validate().model_run(model_context, mode))
+        # the visible rows are updated first
+        self.assertEqual([header_item.row for header_item in visible_update.header_items], list(range(20, 25)))
+        rows = [header_item.row for header_item in update.header_items]
+        self.assertEqual(sorted(rows), list(range(10, 20)) + list(range(25, 30)))
+        for header_item in visible_update.header_items + update.header_items:
+            self.assertEqual(header_item.valid, objects[header_item.row].valid)
+        self.assertFalse(update.cells)
+        # the display caches are left untouched
+        self.assertEqual(len(model_context.edit_cache), 1)
+        self.assertEqual(len(model_context.attributes_cache), 0)
+
+    def test_validate_beyond_the_end(self):
+        from camelot.view.crud_action import Validate
+        objects = [FakeObject() for i in range(15)]
+        admin = mock.MagicMock()
+        admin.list_action = None
+        admin.get_verbose_identifier.return_value = ''
+        validator = mock.MagicMock()
+        validator.validate_object.return_value = []
+        proxy = mock.MagicMock()
+        proxy.__len__.return_value = len(objects)
+
+        def getitem(sl):
+            if sl.stop > len(objects):
+                raise IndexError()
+            return objects[sl]
+
+        proxy.__getitem__.side_effect = getitem
+        model_context = types.SimpleNamespace(admin=admin, proxy=proxy, validator=validator)
+        mode = {'offset': 10, 'limit': 20, 'visible': [12, 10]}
+        updates = list(Validate().model_run(model_context, mode))
+        rows = [header_item.row for update in updates for header_item in update.header_items]
+        self.assertEqual(rows, list(range(12, 15)) + list(range(10, 12)))
+        mode = {'offset': 20, 'limit': 20}
+        self.assertEqual(list(Validate().model_run(model_context, mode)), [])
+
+
+class OpenFileStreamCase(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def stream(self, content, chunk_size=6):
+        import base64
+        import os
+        path = os.path.join(self.directory.name, 'file.txt')
+        with open(path, 'wb') as f:
+            f.write(content)
+        open_file = action_steps.OpenFile(path, type='stream')
+        open_file.chunk_size = chunk_size
+        self.assertEqual(open_file.size, len(content))
+        chunks = list(open_file.get_chunks())
+        for chunk in chunks:
+            self.assertEqual(chunk.transfer, open_file.transfer)
+        # only the last chunk has the checksum
+        self.assertTrue(all(chunk.checksum is None for chunk in chunks[:-1]))
+        received = bytearray()
+        for chunk in chunks:
+            self.assertEqual(chunk.offset, len(received))
+            received.extend(base64.b64decode(chunk.content))
+        return chunks, bytes(received)
+
+    def test_stream(self):
+        import hashlib
+        for content in (b'0123456789abcde', b'0123456789ab', b'x'):
+            chunks, received = self.stream(content)
+            self.assertEqual(received, content)
+            self.assertEqual(len(chunks), (len(content) + 5) // 6)
+            self.assertEqual(chunks[-1].checksum, hashlib.sha256(content).hexdigest())
+
+    def test_stream_empty_file(self):
+        import hashlib
+        chunks, received = self.stream(b'')
+        self.assertEqual(received, b'')
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].checksum, hashlib.sha256(b'').hexdigest())
+
+    def test_transfers(self):
+        import os
+        path = os.path.join(self.directory.name, 'file.txt')
+        with open(path, 'wb') as f:
+            f.write(b'x')
+        first = action_steps.OpenFile(path, type='stream')
+        second = action_steps.OpenFile(path, type='stream')
+        self.assertNotEqual(first.transfer, second.transfer)
+        with self.assertRaises(FileNotFoundError):
+            action_steps.OpenFile(os.path.join(self.directory.name, 'missing.txt'), type='stream')
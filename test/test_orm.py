@@ -0,0 +1,424 @@
+import gc
+import unittest
+from unittest import mock
+
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, event, orm
+from sqlalchemy.ext.declarative import declarative_base
+
+from camelot.core.orm import load_many_to_one
+
+Base = declarative_base()
+
+
+class Country(Base):
+    __tablename__ = 'test_country'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(40))
+
+
+class City(Base):
+    __tablename__ = 'test_city'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(40))
+    country_id = Column(Integer, ForeignKey(Country.id))
+    country = orm.relationship(Country)
+
+
+class Account(Base):
+    __tablename__ = 'test_account'
+    id = Column(Integer, primary_key=True)
+    status = Column(String(10))
+    version = Column(Integer, nullable=False)
+    __mapper_args__ = {'version_id_col': version}
+
+
+class Street(Base):
+    __tablename__ = 'test_street'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(40))
+    city_id = Column(Integer, ForeignKey(City.id))
+    city = orm.relationship(City)
+
+
+class OrmCase(unittest.TestCase):
+    """Run the orm helpers against an in memory database"""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        self.session = orm.Session(bind=self.engine, autoflush=False)
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self.count_statement)
+
+    def tearDown(self):
+        event.remove(self.engine, 'before_cursor_execute', self.count_statement)
+        self.session.close()
+        self.engine.dispose()
+
+    def count_statement(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def populate(self, cities=20, countries=5):
+        session = orm.Session(bind=self.engine)
+        country_list = [Country(id=i, name='country {}'.format(i)) for i in range(countries)]
+        session.add_all(country_list)
+        session.add_all([
+            City(id=i, name='city {}'.format(i), country=country_list[i % countries])
+            for i in range(cities)
+        ])
+        session.commit()
+        session.close()
+        del self.statements[:]
+
+
+class LoadManyToOneCase(OrmCase):
+
+    def test_load_many_to_one(self):
+        self.populate()
+        cities = self.session.query(City).all()
+        gc.collect()
+        del self.statements[:]
+        countries = load_many_to_one(cities, 'country')
+        self.assertEqual(len(countries), 20)
+        self.assertEqual(len(self.statements), 1)
+        gc.collect()
+        names = set(city.country.name for city in cities)
+        self.assertEqual(len(names), 5)
+        # no lazy loads after the prefetch
+        self.assertEqual(len(self.statements), 1)
+
+    def test_load_many_to_one_ignores_loaded(self):
+        self.populate()
+        cities = self.session.query(City).all()
+        cities[0].country
+        del self.statements[:]
+        load_many_to_one(cities, 'country')
+        self.assertEqual(len(self.statements), 1)
+        load_many_to_one(cities, 'country')
+        self.assertEqual(len(self.statements), 1)
+
+
+class BulkDeleteCase(OrmCase):
+
+    def test_bulk_delete(self):
+        from camelot.core.orm import bulk_delete
+        self.populate(cities=30)
+        cities = self.session.query(City).order_by(City.id).all()
+        pending = City(id=100, name='pending')
+        self.session.add(pending)
+        transient = City(id=101, name='transient')
+        del self.statements[:]
+        bulk_delete(cities[:25] + [pending, transient], chunk_size=10)
+        deletes = [s for s in self.statements if s.startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertNotIn(pending, self.session)
+        self.assertNotIn(cities[0], self.session)
+        self.session.flush()
+        self.assertEqual(self.session.query(City).count(), 5)
+
+
+class BulkUpdateCase(OrmCase):
+
+    def test_bulk_update(self):
+        from camelot.core.orm import bulk_update
+        self.populate(cities=30)
+        cities = self.session.query(City).all()
+        del self.statements[:]
+        bulk_update(cities, 'name', 'renamed', chunk_size=20)
+        updates = [s for s in self.statements if s.startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(self.session.dirty)
+        self.assertEqual(set(city.name for city in cities), {'renamed'})
+        self.session.expire_all()
+        self.assertEqual(self.session.query(City).filter_by(name='renamed').count(), 30)
+
+    def test_bulk_update_version(self):
+        from camelot.core.orm import bulk_update
+        session = orm.Session(bind=self.engine)
+        session.add_all([Account(id=i, status='new') for i in range(10)])
+        session.commit()
+        # increase the version of some of the accounts
+        for account in session.query(Account).filter(Account.id < 5):
+            account.status = 'open'
+        session.commit()
+        session.close()
+        accounts = self.session.query(Account).all()
+        bulk_update(accounts, 'status', 'closed')
+        self.assertEqual(sorted(a.version for a in accounts), [2] * 5 + [3] * 5)
+        self.session.expire_all()
+        for account in self.session.query(Account).all():
+            self.assertEqual(account.status, 'closed')
+            self.assertEqual(account.version, 3 if account.id < 5 else 2)
+
+    def test_bulk_update_stale(self):
+        from camelot.core.orm import bulk_update
+        session = orm.Session(bind=self.engine)
+        session.add_all([Account(id=i, status='new') for i in range(3)])
+        session.commit()
+        accounts = self.session.query(Account).all()
+        session.query(Account).get(1).status = 'open'
+        session.commit()
+        session.close()
+        with self.assertRaises(orm.exc.StaleDataError):
+            bulk_update(accounts, 'status', 'closed')
+
+
+class UpdateOrCreateManyCase(OrmCase):
+
+    def test_update_existing(self):
+        from camelot.core.orm.entity import update_or_create_many
+        self.populate(cities=30, countries=5)
+        rows = [
+            {'id': i, 'name': 'city {}'.format(i), 'country': {'id': i % 5, 'name': 'country'}}
+            for i in range(30)
+        ]
+        gc.collect()
+        cities = update_or_create_many(City, rows, self.session, chunk_size=20)
+        selects = [s for s in self.statements if s.startswith('SELECT')]
+        # two queries for the cities and one for the countries
+        self.assertEqual(len(selects), 3)
+        self.assertEqual(len(cities), 30)
+        self.assertFalse(self.session.new)
+        self.session.flush()
+        self.assertEqual(self.session.query(City).count(), 30)
+        self.assertEqual(self.session.query(Country).count(), 5)
+        self.assertEqual(set(city.country.name for city in cities), {'country'})
+
+
+class ExportEntitiesCase(OrmCase):
+
+    deep = {'city': {'country': {}}}
+
+    def setUp(self):
+        super().setUp()
+        self.populate(cities=10, countries=3)
+        session = orm.Session(bind=self.engine)
+        session.add_all([Street(id=i, name='street {}'.format(i), city_id=i % 10) for i in range(30)])
+        session.commit()
+        session.close()
+        del self.statements[:]
+
+    def test_loader_options(self):
+        from camelot.core.orm.entity import _deep_loader_options
+        mapper = orm.class_mapper(Street)
+        self.assertEqual(len(_deep_loader_options(mapper, {})), 0)
+        self.assertEqual(len(_deep_loader_options(mapper, {'city': {}})), 1)
+        # one option for the whole path
+        self.assertEqual(len(_deep_loader_options(mapper, self.deep)), 1)
+
+    def test_same_as_entity_to_dict(self):
+        from camelot.core.orm.entity import entity_to_dict, export_entities
+        query = self.session.query(Street).order_by(Street.id)
+        expected = [entity_to_dict(street, self.deep) for street in query.all()]
+        self.session.expunge_all()
+        gc.collect()
+        del self.statements[:]
+        exported = list(export_entities(query, self.deep, yield_per=10))
+        self.assertEqual(exported, expected)
+        self.assertEqual(exported[0]['city']['country']['name'], 'country 0')
+        # no query per object, but a query per relationship for each chunk
+        self.assertLessEqual(len(self.statements), 1 + 3 * 2)
+
+    def test_exclude(self):
+        from camelot.core.orm.entity import entity_to_dict, export_entities
+        query = self.session.query(Street).order_by(Street.id)
+        expected = [entity_to_dict(street, self.deep, ['name'], True) for street in query.all()]
+        self.session.expunge_all()
+        exported = list(export_entities(query, self.deep, ['name'], True, yield_per=7))
+        self.assertEqual(exported, expected)
+        self.assertNotIn('name', exported[0])
+        self.assertIn('id', exported[0]['city'])
+
+    def test_export_to_json(self):
+        import io
+        import json
+        from camelot.core.orm.entity import entity_to_dict, export_entities_to_json
+        query = self.session.query(Street).order_by(Street.id)
+        expected = [entity_to_dict(street, self.deep) for street in query.all()]
+        self.session.expunge_all()
+        stream = io.StringIO()
+        self.assertEqual(export_entities_to_json(query, stream, self.deep), 30)
+        self.assertEqual([json.loads(line) for line in stream.getvalue().splitlines()], expected)
+
+
+class EntityMetadataCase(unittest.TestCase):
+
+    def setUp(self):
+        from camelot.core.orm.entity import EntityMeta
+
+        class FakeEntityMeta(type):
+            _get_entity_metadata = EntityMeta._get_entity_metadata
+            _get_polymorphic_types = EntityMeta._get_polymorphic_types
+            get_polymorphic_types = EntityMeta.get_polymorphic_types
+            get_discriminator_value = EntityMeta.get_discriminator_value
+            endpoint = EntityMeta.endpoint
+
+        class Parent(metaclass=FakeEntityMeta):
+            __mapper_args__ = {}
+
+        class Child(Parent):
+            pass
+
+        self.classes = (Parent, Child)
+
+    def test_metadata_once_per_class(self):
+        from camelot.core.orm import entity
+        with mock.patch.object(entity, 'EntityMetadata', wraps=entity.EntityMetadata) as entity_metadata:
+            for i in range(10):
+                for cls in self.classes:
+                    self.assertIsNone(cls.get_polymorphic_types())
+        self.assertEqual(entity_metadata.call_count, 2)
+        parent, child = self.classes
+        # the metadata of a class is not inherited
+        self.assertIsNot(parent._get_entity_metadata(), child._get_entity_metadata())
+
+    def test_endpoint_once_per_class(self):
+        import sys
+        import types
+        endpoint = mock.Mock()
+        endpoint.discriminator = [mock.Mock(key='kind')]
+        endpoint_module = types.SimpleNamespace(Endpoint=mock.Mock())
+        endpoint_module.Endpoint.get.return_value = None
+        modules = {'vfinance': mock.Mock(), 'vfinance.model': mock.Mock(), 'vfinance.model.endpoint': endpoint_module}
+        parent, _child = self.classes
+        with mock.patch.dict(sys.modules, modules):
+            # the endpoint is looked up again as long as it is not registered
+            self.assertIsNone(parent.endpoint)
+            self.assertIsNone(parent.endpoint)
+            self.assertEqual(endpoint_module.Endpoint.get.call_count, 2)
+            endpoint_module.Endpoint.get.return_value = endpoint
+            for i in range(10):
+                self.assertIs(parent.endpoint, endpoint)
+            self.assertEqual(endpoint_module.Endpoint.get.call_count, 3)
+            instance = parent()
+            instance.kind = 'a'
+            self.assertEqual(parent.get_discriminator_value(instance), ('a',))
+
+
+class ReadonlyEntityCacheCase(OrmCase):
+
+    def setUp(self):
+        super().setUp()
+        from camelot.core.orm.cache import ReadonlyEntityCache
+        self.cache = ReadonlyEntityCache()
+        self.cache._readonly_mappers.update({
+            orm.class_mapper(Country): True,
+            orm.class_mapper(City): False,
+            orm.class_mapper(Account): False,
+        })
+        self.cache.install(Base)
+        self.addCleanup(event.remove, Base, 'load', self.cache._loaded)
+        self.populate()
+        other_session = orm.Session(bind=self.engine)
+        other_session.query(Country).all()
+        other_session.query(City).all()
+        other_session.close()
+        del self.statements[:]
+
+    def test_load_many_to_one(self):
+        import camelot.core.orm
+        self.assertEqual(len(self.cache), 5)
+        cities = self.session.query(City).all()
+        del self.statements[:]
+        with mock.patch.object(camelot.core.orm, 'readonly_entity_cache', self.cache):
+            countries = load_many_to_one(cities, 'country')
+        self.assertEqual(len(countries), 20)
+        self.assertEqual(self.cache.hits, 5)
+        gc.collect()
+        self.assertEqual(len(set(city.country.name for city in cities)), 5)
+        self.assertEqual(self.session.query(Country).get(1).name, 'country 1')
+        self.assertEqual(self.statements, [])
+
+    def test_get(self):
+        country = self.cache.get(self.session, Country, (2,))
+        self.assertEqual(country.name, 'country 2')
+        self.assertIs(country, self.session.query(Country).get(2))
+        self.assertEqual(self.statements, [])
+        # other entities are not cached
+        self.assertEqual(self.cache.get(self.session, City, (2,)).name, 'city 2')
+        self.assertEqual(len(self.statements), 1)
+
+
+class SessionHygieneCase(OrmCase):
+
+    def setUp(self):
+        super().setUp()
+        from camelot.core.orm.hygiene import SessionHygiene
+        self.hygiene = SessionHygiene()
+        self.populate()
+        # the cities remain referenced, like in a forgotten cache
+        self.cities = self.session.query(City).order_by(City.id).all()
+        for city in self.cities:
+            city.country
+
+    def test_prune(self):
+        from camelot.core.item_model.proxy import AbstractModelProxy
+
+        class ListProxy(AbstractModelProxy):
+
+            def __init__(self, objects):
+                self._objects = objects
+
+            def referenced_objects(self):
+                return self._objects
+
+        proxy = ListProxy(self.cities[:5])
+        self.cities[10].name = 'modified'
+        self.hygiene.register(proxy.referenced_objects)
+        report = self.hygiene.prune(self.session)
+        self.assertEqual(report.size_before, 25)
+        self.assertEqual(report.size_after, 11)
+        self.assertEqual(report.pruned, {'City': 14})
+        kept = set(city.id for city in self.cities if city in self.session)
+        self.assertEqual(kept, {0, 1, 2, 3, 4, 10})
+
+    def test_unknown_proxy_objects(self):
+        import collections
+        from camelot.core.item_model.proxy import AbstractModelProxy
+        from camelot.core.orm.hygiene import model_context_objects
+
+        class DequeProxy(AbstractModelProxy):
+
+            def __init__(self, objects):
+                self._objects = collections.deque(objects)
+
+        model_context = mock.Mock(proxy=DequeProxy(self.cities), edit_cache=None, obj=None)
+        with mock.patch('camelot.core.orm.hygiene._bound_objects', return_value=[model_context]):
+            self.assertIsNone(model_context_objects())
+        self.hygiene.register(model_context.proxy.referenced_objects)
+        self.assertIsNone(self.hygiene.prune(self.session))
+        self.assertTrue(all(city in self.session for city in self.cities))
+
+    def test_unknown_objects(self):
+        self.hygiene.register(lambda: self.cities[:5])
+        self.hygiene.register(lambda: None)
+        self.assertIsNone(self.hygiene.prune(self.session))
+        self.assertEqual(len(self.session.identity_map), 25)
+
+    def test_running_actions(self):
+        from camelot.core.orm.hygiene import model_run_objects
+        from camelot.view.requests import model_run_names
+        self.assertEqual(model_run_objects(), [])
+        run = object()
+        model_run_names.bind('hygiene', run)
+        try:
+            self.assertIsNone(model_run_objects())
+        finally:
+            model_run_names.unbind('hygiene')
+
+    def test_removed_bindings(self):
+        from camelot.core.naming import BindingType, NameNotFoundException, initial_naming_context
+        from camelot.core.orm.hygiene import named_objects
+        context = initial_naming_context.resolve_context('object')
+        resolve = context.resolve
+
+        def resolve_removed(name):
+            raise NameNotFoundException(name, BindingType.named_object)
+
+        obj = object()
+        context.bind('hygiene', obj)
+        self.addCleanup(context.unbind, 'hygiene')
+        self.assertIn(obj, named_objects())
+        with mock.patch.object(context, 'resolve', side_effect=resolve_removed):
+            self.assertEqual(named_objects(), [])
+        self.assertIs(context.resolve, resolve)
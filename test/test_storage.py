@@ -0,0 +1,231 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+from pathlib import Path, PurePath
+
+from camelot.core.conf import settings
+from camelot.core.files.storage import (
+    CachedStorage, CompressedStorage, ContentStorage, HashStorage, Storage, StoredFile
+)
+
+
+class StorageCase(unittest.TestCase):
+    """Use a temporary directory as the media root"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = types.SimpleNamespace(CAMELOT_MEDIA_ROOT=os.path.join(self.directory, 'media'))
+        settings.insert(0, self.settings)
+
+    def tearDown(self):
+        settings.remove(self.settings)
+        shutil.rmtree(self.directory)
+
+    def local_file(self, name, content):
+        path = Path(self.directory, name)
+        path.write_bytes(content)
+        return path
+
+
+class ContentStorageCase(StorageCase):
+
+    def test_deduplicate(self):
+        storage = ContentStorage(PurePath('content'))
+        first = storage.checkin(self.local_file('a.txt', b'same'))
+        second = storage.checkin(self.local_file('b.txt', b'same'))
+        third = storage.checkin(self.local_file('c.txt', b'other'))
+        self.assertEqual(first.name, second.name)
+        self.assertNotEqual(first.name, third.name)
+        self.assertEqual(first.name.parts[:2], (first.content_hash[:2], first.content_hash[2:4]))
+        self.assertEqual(second.verbose_name, 'b.txt')
+        self.assertEqual(len(list(storage.list_files())), 2)
+        # the file remains as long as it is referenced
+        storage.delete(first.name)
+        self.assertEqual(storage.collect_garbage(), 0)
+        self.assertTrue(storage.exists(first.name))
+        storage.delete(second.name)
+        self.assertEqual(storage.collect_garbage(), 1)
+        self.assertFalse(storage.exists(first.name))
+        self.assertTrue(storage.exists(third.name))
+        self.assertEqual([stored_file.name for stored_file in storage.list_files()], [third.name])
+
+    def test_deduplicate_stream_with_dotted_prefix(self):
+        storage = ContentStorage(PurePath('content'))
+        first = storage.checkin_stream('report.v1', '', io.BytesIO(b'same'))
+        second = storage.checkin_stream('report.v1', '', io.BytesIO(b'same'))
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(first.name.name, first.content_hash + '.v1')
+        third = storage.checkin_stream('report.v1', '.txt', io.BytesIO(b'same'))
+        self.assertEqual(third.name.name, first.content_hash + '.txt')
+
+
+class ManifestCase(StorageCase):
+
+    def test_indexed_listing(self):
+        storage = Storage(PurePath('files'), indexed=True)
+        stored_files = [storage.checkin(self.local_file(name, b'x')) for name in ('ab.txt', 'ac.pdf', 'b.txt')]
+        self.assertEqual(
+            sorted(f.name for f in storage.list_files()), sorted(f.name for f in stored_files)
+        )
+        self.assertEqual(
+            sorted(f.name for f in storage.list_files(prefix='a')), sorted(f.name for f in stored_files[:2])
+        )
+        self.assertEqual([f.name for f in storage.list_files(prefix='a', suffix='.txt')], [stored_files[0].name])
+        storage.delete(stored_files[0].name)
+        self.assertEqual(len(list(storage.list_files(prefix='a'))), 1)
+
+    def test_rebuild_index(self):
+        unindexed = Storage(PurePath('files'))
+        stored_files = [unindexed.checkin(self.local_file('{}.txt'.format(i), b'x')) for i in range(5)]
+        storage = Storage(PurePath('files'), indexed=True)
+        self.assertEqual(list(storage.list_files()), [])
+        self.assertEqual(storage.rebuild_index(), 5)
+        self.assertEqual(
+            sorted(f.name for f in storage.list_files()), sorted(f.name for f in stored_files)
+        )
+
+    def test_hash_storage(self):
+        storage = HashStorage(PurePath('hashed'), indexed=True)
+        stored_file = storage.checkin(self.local_file('a.txt', b'x'))
+        self.assertTrue(storage.exists(stored_file.name))
+        self.assertEqual([f.name for f in storage.list_files()], [stored_file.name])
+        self.assertEqual(storage.rebuild_index(), 1)
+        self.assertEqual([f.name for f in storage.list_files()], [stored_file.name])
+
+
+class CheckinManyCase(StorageCase):
+
+    def test_checkin_many(self):
+        storage = Storage(PurePath('files'))
+        local_paths = [self.local_file('{}.txt'.format(i), b'x' * i) for i in range(10)]
+        progress = []
+        checked_in = list(storage.checkin_many(local_paths, progress=lambda *args: progress.append(args)))
+        self.assertEqual(set(local_path for local_path, _stored_file in checked_in), set(local_paths))
+        self.assertEqual(progress[-1], (10, 10))
+        for local_path, stored_file in checked_in:
+            self.assertEqual(storage.checkout(stored_file).read_bytes(), local_path.read_bytes())
+
+    def test_checkin_many_failure(self):
+        storage = Storage(PurePath('files'))
+        local_paths = [self.local_file('{}.txt'.format(i), b'x') for i in range(10)]
+        local_paths.insert(5, Path(self.directory, 'missing.txt'))
+        returned = []
+        with self.assertRaises(FileNotFoundError):
+            for _local_path, stored_file in storage.checkin_many(local_paths, max_workers=2):
+                returned.append(stored_file.name)
+        # only the files that were returned remain in the storage
+        self.assertEqual(
+            sorted(stored_file.name for stored_file in storage.list_files()), sorted(returned)
+        )
+
+
+class CachedStorageCase(StorageCase):
+
+    def setUp(self):
+        super().setUp()
+        self.storage = Storage(PurePath('files'))
+        self.cache_directory = Path(self.directory, 'cache')
+
+    def cached_storage(self, **kwargs):
+        return CachedStorage(self.storage, cache_directory=self.cache_directory, **kwargs)
+
+    def test_checkout(self):
+        storage = self.cached_storage()
+        stored_file = storage.checkin(self.local_file('a.txt', b'a' * 100))
+        path = storage.checkout(stored_file)
+        self.assertEqual(path.parent, self.cache_directory)
+        self.assertEqual(path.suffix, '.txt')
+        self.assertEqual(path.read_bytes(), b'a' * 100)
+        # the file is not copied again
+        Path(self.storage._path(stored_file.name)).unlink()
+        self.assertEqual(storage.checkout(stored_file), path)
+
+    def test_checkout_missing_file(self):
+        storage = self.cached_storage()
+        stored_file = StoredFile(storage, PurePath('missing.txt'), 'missing.txt')
+        path = storage.checkout(stored_file)
+        self.assertEqual(path, Path(self.storage._path(stored_file.name)))
+        self.assertFalse(path.exists())
+
+    def test_checked_out_files_not_evicted(self):
+        storage = self.cached_storage(max_cache_size=150)
+        first = storage.checkout(storage.checkin(self.local_file('a.txt', b'a' * 100)))
+        second = storage.checkout(storage.checkin(self.local_file('b.txt', b'b' * 100)))
+        self.assertTrue(first.exists())
+        self.assertTrue(second.exists())
+        storage.pin_time = 0
+        third = storage.checkout(storage.checkin(self.local_file('c.txt', b'c' * 100)))
+        self.assertFalse(first.exists())
+        self.assertFalse(second.exists())
+        self.assertTrue(third.exists())
+
+    def test_availability_memoized(self):
+        storage = self.cached_storage()
+        with mock.patch.object(self.storage, 'available', wraps=self.storage.available) as available:
+            stored_files = [storage.checkin(self.local_file('{}.txt'.format(i), b'x')) for i in range(3)]
+            stored_files.append(storage.checkin_stream('stream', '.txt', io.BytesIO(b'y')))
+            stored_files.extend(stored_file for _local_path, stored_file in storage.checkin_many(
+                [self.local_file('many{}.txt'.format(i), b'z') for i in range(3)]
+            ))
+            # the files are fetched into the cache
+            for stored_file in stored_files:
+                self.assertEqual(storage.checkout(stored_file).parent, self.cache_directory)
+        self.assertEqual(len(stored_files), 7)
+        self.assertEqual(available.call_count, 1)
+
+    def test_prefetch(self):
+        storage = self.cached_storage(max_cache_size=150)
+        storage.max_pending_prefetches = 2
+        stored_files = [storage.checkin(self.local_file('{}.txt'.format(i), b'x' * 10)) for i in range(5)]
+        storage.prefetch(stored_files)
+        storage._executor.shutdown(wait=True)
+        self.assertEqual(len(storage._cached_files), 2)
+        self.assertEqual(len(storage._pending_prefetches), 0)
+
+
+class CompressedStorageCase(StorageCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache_directory = Path(self.directory, 'decompressed')
+        self.storage = CompressedStorage(
+            PurePath('files'), cache_directory=self.cache_directory, max_cache_size=150
+        )
+
+    def test_checkin_checkout(self):
+        stored_file = self.storage.checkin(self.local_file('a.txt', b'a' * 100))
+        self.assertEqual(stored_file.name.suffix, '.camelot-gz')
+        self.assertEqual(stored_file.verbose_name, 'a.txt')
+        self.assertLess(Path(self.storage._path(stored_file.name)).stat().st_size, 100)
+        with self.storage.checkout_stream(stored_file) as stream:
+            self.assertEqual(stream.read(), b'a' * 100)
+        path = self.storage.checkout(stored_file)
+        self.assertEqual(path.parent, self.cache_directory)
+        self.assertEqual(path.suffix, '.txt')
+        self.assertEqual(path.read_bytes(), b'a' * 100)
+        self.assertEqual([f.name for f in self.storage.list_files(suffix='.txt')], [stored_file.name])
+
+    def test_user_compressed_file(self):
+        content = gzip.compress(b'a' * 100)
+        stored_file = Storage(PurePath('files')).checkin(self.local_file('a.gz', content))
+        stored_file = StoredFile(self.storage, stored_file.name, stored_file.verbose_name)
+        with self.storage.checkout_stream(stored_file) as stream:
+            self.assertEqual(stream.read(), content)
+        self.assertEqual(self.storage.checkout(stored_file), Path(self.storage._path(stored_file.name)))
+
+    def test_checkout_bounded(self):
+        self.storage.checkout(self.storage.checkin(self.local_file('a.txt', b'a' * 100)))
+        self.storage._cache.pin_time = 0
+        self.storage.checkout(self.storage.checkin(self.local_file('b.txt', b'b' * 100)))
+        self.assertEqual(len(list(self.cache_directory.iterdir())), 1)
+
+    def test_checkout_missing_file(self):
+        stored_file = StoredFile(self.storage, PurePath('missing.txt.camelot-gz'), 'missing.txt')
+        path = self.storage.checkout(stored_file)
+        self.assertEqual(path, Path(self.storage._path(stored_file.name)))
+        self.assertFalse(path.exists())
@@ -0,0 +1,250 @@
+import unittest
+from unittest import mock
+
+from camelot.admin.action.field_action import FieldActionModelContext
+from camelot.core.item_model import ChoicesRole, PreviewRole
+from camelot.core.naming import initial_naming_context
+from camelot.view.controls import delegates
+
+
+class ComboBoxDelegateCase(unittest.TestCase):
+
+    def setUp(self):
+        self.choices = [(i, 'choice {}'.format(i)) for i in range(20)]
+
+    def model_context(self, value, static):
+        model_context = FieldActionModelContext(None)
+        model_context.value = value
+        model_context.field_attributes = {'choices': self.choices}
+        if static:
+            model_context.static_field_attributes = {'choices': self.choices}
+        return model_context
+
+    def test_static_choices_bound_once_per_column(self):
+        with mock.patch.object(initial_naming_context, '_bind_object',
+                               wraps=initial_naming_context._bind_object) as bind:
+            for row in range(50):
+                item = delegates.ComboBoxDelegate.get_standard_item(
+                    None, self.model_context(row % 10, True)
+                )
+                self.assertIsNone(item.roles[ChoicesRole])
+        # one bind for the value of each cell, and the choices only once
+        self.assertEqual(bind.call_count, 50 + len(self.choices))
+
+    def test_static_choices_with_virtual_value(self):
+        item = delegates.ComboBoxDelegate.get_standard_item(
+            None, self.model_context(100, True)
+        )
+        choices = item.roles[ChoicesRole]
+        self.assertEqual(len(choices), 1)
+        self.assertTrue(choices[0]['virtual'])
+
+    def test_dynamic_choices_in_item(self):
+        item = delegates.ComboBoxDelegate.get_standard_item(
+            None, self.model_context(1, False)
+        )
+        # the choices and the None choice
+        self.assertEqual(len(item.roles[ChoicesRole]), len(self.choices) + 1)
+
+
+class Many2OneDelegateCase(unittest.TestCase):
+
+    def test_verbose_name_once_per_request(self):
+        admin = mock.Mock()
+        admin.get_verbose_object_name.side_effect = lambda obj: obj.name
+        related = [mock.Mock() for i in range(2)]
+        for i, obj in enumerate(related):
+            obj.name = 'related {}'.format(i)
+        field_attributes = {'field_name': 'related', 'admin': admin}
+        objects = [mock.Mock(related=related[i % 2]) for i in range(10)]
+        with mock.patch('camelot.view.controls.delegates.many2onedelegate.load_many_to_one'):
+            prefetched_data = delegates.Many2OneDelegate.prefetch_data(objects, field_attributes)
+        for obj in objects:
+            model_context = FieldActionModelContext(None)
+            model_context.value = obj.related
+            model_context.field_attributes = field_attributes
+            model_context.prefetched_data = prefetched_data
+            item = delegates.Many2OneDelegate.get_standard_item(None, model_context)
+            self.assertEqual(item.roles[PreviewRole], obj.related.name)
+        self.assertEqual(admin.get_verbose_object_name.call_count, 2)
+        # without prefetched data, the verbose name is computed for each item
+        model_context.prefetched_data = {}
+        delegates.Many2OneDelegate.get_standard_item(None, model_context)
+        self.assertEqual(admin.get_verbose_object_name.call_count, 3)
+
+
+class ColumnRolesCase(unittest.TestCase):
+
+    field_attributes = {'minimum': 0, 'maximum': 10, 'precision': 3,
+                        'prefix': 'EUR'}
+
+    def test_column_roles(self):
+        from camelot.core.item_model import MinimumRole, PrecisionRole, PrefixRole
+        for delegate in (delegates.FloatDelegate, delegates.IntegerDelegate):
+            roles = delegate.get_column_roles(self.field_attributes)
+            self.assertEqual(roles[PrefixRole], 'EUR')
+            self.assertIsNotNone(roles[MinimumRole])
+        roles = delegates.FloatDelegate.get_column_roles(self.field_attributes)
+        self.assertEqual(roles[PrecisionRole], 3)
+
+    def add_data(self, dynamic_field_attributes):
+        from camelot.core.item_model import PrecisionRole
+        from camelot.view.crud_action import DataCell, UpdateMixin
+        static_field_attributes = dict(
+            self.field_attributes, field_name='value', delegate=delegates.FloatDelegate
+        )
+        model_context = mock.Mock()
+        model_context.static_field_attributes = [static_field_attributes]
+        model_context.admin.list_action = None
+        model_context.admin.get_dynamic_field_attributes.side_effect = \
+            lambda obj, names: [dict(dynamic_field_attributes) for name in names]
+        model_context.edit_cache.add_data.return_value = {0}
+        model_context.attributes_cache.add_data.return_value = set()
+        update = UpdateMixin()
+        with mock.patch.object(delegates.FloatDelegate, 'get_standard_item', side_effect=lambda *args: DataCell()), \
+             mock.patch.object(delegates.FloatDelegate, 'get_column_roles',
+                               wraps=delegates.FloatDelegate.get_column_roles) as get_column_roles, \
+             mock.patch.object(UpdateMixin, 'get_header_item', return_value=None):
+            column_roles = update.get_column_roles(model_context, [0])
+            for row in range(10):
+                for _row, _header_item, items in update.add_data(
+                    model_context, row, [0], mock.Mock(value=row), True, column_roles):
+                    self.assertEqual(items[0].roles[PrecisionRole], 3)
+        return get_column_roles.call_count
+
+    def test_column_roles_once_per_request(self):
+        self.assertEqual(self.add_data({}), 1)
+
+    def test_dynamic_column_roles(self):
+        self.assertEqual(self.add_data({'precision': 3}), 11)
+
+
+class EncodeCachesCase(unittest.TestCase):
+
+    def setUp(self):
+        from camelot.view.controls.delegates import customdelegate
+        for cache in (customdelegate._encoded_routes_cache, customdelegate._encoded_states_cache):
+            patcher = mock.patch.dict(cache, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.states_cache = customdelegate._encoded_states_cache
+
+    def test_equal_states_encoded_once(self):
+        from camelot.admin.action.base import State
+        first = delegates.CustomDelegate.encode_action_states([State(verbose_name='a')])
+        second = delegates.CustomDelegate.encode_action_states([State(verbose_name='a')])
+        self.assertIs(first, second)
+        self.assertEqual(len(self.states_cache), 1)
+        other = delegates.CustomDelegate.encode_action_states([State(verbose_name='b')])
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(self.states_cache), 2)
+
+    def test_equal_scalars_of_other_types(self):
+        from camelot.admin.action.base import State
+        encoded = [
+            delegates.CustomDelegate.encode_action_states([State(enabled=enabled)])
+            for enabled in (True, 1, 1.0)
+        ]
+        self.assertEqual(len(set(encoded)), 3)
+        self.assertNotEqual(
+            delegates.CustomDelegate.encode_action_routes([('a', 1)]),
+            delegates.CustomDelegate.encode_action_routes([('a', True)]),
+        )
+
+    def test_unhashable_content_not_cached(self):
+        from camelot.admin.action.base import State
+        encoded = delegates.CustomDelegate.encode_action_states([State(color={'red': 1})])
+        self.assertIn('red', encoded)
+        self.assertEqual(len(self.states_cache), 0)
+
+    def test_cache_size_bounded(self):
+        from camelot.admin.action.base import State
+        with mock.patch('camelot.view.controls.delegates.customdelegate._encoded_cache_size', 5):
+            for i in range(10):
+                delegates.CustomDelegate.encode_action_states([State(verbose_name=str(i))])
+        self.assertEqual(len(self.states_cache), 5)
+
+
+class RangesCase(unittest.TestCase):
+
+    def setUp(self):
+        from camelot.core.item_model.proxy import AbstractModelProxy
+
+        class ListProxy(AbstractModelProxy):
+
+            def __init__(self, objects):
+                self._objects = objects
+                self.slices = []
+
+            def __getitem__(self, sl, yield_per=None):
+                self.slices.append((sl.start, sl.stop))
+                return iter(self._objects[sl])
+
+        self.proxy = ListProxy(list(range(100)))
+
+    def test_merge_ranges(self):
+        from camelot.core.item_model.proxy import merge_ranges
+        self.assertEqual(merge_ranges([]), [])
+        self.assertEqual(merge_ranges([(5, 7), (1, 2), (3, 3)]), [(1, 3), (5, 7)])
+        self.assertEqual(merge_ranges([(1, 10), (2, 4), (10, 12)]), [(1, 12)])
+        self.assertEqual(merge_ranges([(4, 4), (4, 4)]), [(4, 4)])
+        # empty ranges are skipped
+        self.assertEqual(merge_ranges([(5, 4), (1, 1)]), [(1, 1)])
+
+    def test_get_ranges(self):
+        objects = list(self.proxy.get_ranges([(0, 4), (10, 11)]))
+        self.assertEqual(objects, [0, 1, 2, 3, 4, 10, 11])
+        self.assertEqual(self.proxy.slices, [(0, 5), (10, 12)])
+
+    def test_get_ranges_yield_per(self):
+        objects = list(self.proxy.get_ranges([(0, 9), (20, 20)], 4))
+        self.assertEqual(objects, list(range(10)) + [20])
+        self.assertEqual(self.proxy.slices, [(0, 4), (4, 8), (8, 10), (20, 21)])
+        for yield_per in (0, -1):
+            self.proxy.slices = []
+            self.assertEqual(list(self.proxy.get_ranges([(0, 9)], yield_per)), list(range(10)))
+            self.assertEqual(self.proxy.slices, [(0, 10)])
+
+
+class ProgressThrottleCase(unittest.TestCase):
+
+    def setUp(self):
+        from camelot.view.requests import ProgressThrottle
+        self.sent = []
+        self.throttle = ProgressThrottle(0.1, self.sent.append)
+
+    def tearDown(self):
+        self.throttle.flush()
+
+    def test_coalesce(self):
+        from camelot.view.action_steps import UpdateProgress
+        for i in range(10):
+            self.throttle.throttle(UpdateProgress(i, 10, detail=str(i)))
+        self.assertEqual(len(self.sent), 1)
+        self.throttle.flush()
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.sent[1].value, 9)
+        self.assertEqual(self.sent[1].detail, '\n'.join(str(i) for i in range(1, 10)))
+
+    def test_keep_clear_details(self):
+        from camelot.view.action_steps import UpdateProgress
+        self.throttle.throttle(UpdateProgress(0, 10))
+        self.throttle.throttle(UpdateProgress(1, 10, clear_details=True))
+        self.throttle.throttle(UpdateProgress(2, 10, detail='two'))
+        self.throttle.flush()
+        self.assertTrue(self.sent[-1].clear_details)
+        self.assertEqual(self.sent[-1].detail, 'two')
+
+    def test_send_after_interval(self):
+        import time
+        from camelot.view.action_steps import UpdateProgress
+        self.throttle.throttle(UpdateProgress(0, 10))
+        self.throttle.throttle(UpdateProgress(1, 10, text='busy'))
+        self.assertEqual(len(self.sent), 1)
+        # the kept step is sent with the next step after the interval
+        time.sleep(0.3)
+        self.assertEqual(len(self.sent), 1)
+        self.throttle.throttle(UpdateProgress(2, 10))
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.sent[1].value, 2)
+        self.assertEqual(self.sent[1].text, 'busy')